@@ -1,17 +1,34 @@
 import os
 import json
-import base64
 import re
 import shutil
 import threading
+import functools
+from contextlib import contextmanager
+from dataclasses import dataclass
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import tqdm
+import httpx
 from openai import OpenAI
 import ast
 
-from utils.lrc_tools import LightroomManager
-from utils.aigc_tools import AIGCManager
+try:
+    import pybase64 as base64  # SIMD-accelerated, drop-in compatible
+except ImportError:
+    import base64
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
 from utils.lua_converter import LuaConverter
 from prompts import SYSTEM_PROMPT, REFLECT_SYSTEM_PROMPT, DEFAULT_USER_PROMPT
 
@@ -26,7 +43,8 @@ class Response:
 class APIClient:
     """OpenAI-compatible API client for vision-language models"""
     
-    def __init__(self, api_endpoint, api_port, model_name="qwen3_vl", api_key="0", api_timeout=30):
+    def __init__(self, api_endpoint, api_port, model_name="qwen3_vl", api_key="0", api_timeout=30,
+                 max_connections=20):
         """
         Initialize API client
         
@@ -36,6 +54,7 @@ class APIClient:
             model_name: Model identifier
             api_key: Authentication key
             api_timeout: API connection timeout in seconds
+            max_connections: Size of the shared keep-alive connection pool
         """
         self.model_name = model_name
         self.api_endpoint = api_endpoint
@@ -44,10 +63,20 @@ class APIClient:
         self.api_connected = False
         
         try:
+            # One pooled keep-alive client shared by all worker threads
+            http_client = httpx.Client(
+                http2=_HTTP2_AVAILABLE,
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections
+                ),
+                timeout=api_timeout
+            )
             self.client = OpenAI(
                 api_key=api_key,
                 base_url=f"http://{api_endpoint}:{api_port}/v1",
-                timeout=api_timeout
+                timeout=api_timeout,
+                http_client=http_client
             )
             self.api_connected = True
         except Exception as e:
@@ -56,7 +85,7 @@ class APIClient:
             self.client = None
             self.api_connected = False
     
-    def chat(self, messages, system=None, images=None, default_timeout=180, **kwargs):
+    def chat(self, messages, system=None, images=None, default_timeout=180, image_cache=None, **kwargs):
         """
         Send chat request with optional images
         
@@ -65,13 +94,14 @@ class APIClient:
             system: Optional system prompt
             images: Optional list of image paths
             default_timeout: Request timeout in seconds
+            image_cache: Optional per-session {path: data_uri} cache
             **kwargs: Additional API parameters
             
         Returns:
             List containing Response object
         """
         try:
-            formatted_messages = self._format_messages(messages, system, images)
+            formatted_messages = self._format_messages(messages, system, images, image_cache)
             response = self.client.chat.completions.create(
                 model=self.model_name,
                 messages=formatted_messages,
@@ -109,7 +139,7 @@ class APIClient:
             print(f"❌ API call error: {e}")
             return [Response(f"API call failed: {e}")]
     
-    def _format_messages(self, messages, system, images):
+    def _format_messages(self, messages, system, images, image_cache=None):
         """Format messages with system prompt and images"""
         formatted = []
         
@@ -122,7 +152,7 @@ class APIClient:
                 content = [
                     {
                         "type": "image_url",
-                        "image_url": {"url": f"data:image/jpeg;base64,{encode_image(images[image_idx])}"}
+                        "image_url": {"url": cached_data_uri(images[image_idx], image_cache)}
                     },
                     {"type": "text", "text": msg["content"]}
                 ]
@@ -134,31 +164,132 @@ class APIClient:
         return formatted
 
 
+@dataclass
+class _ClientSlot:
+    """API client together with its number of in-flight requests"""
+    client: APIClient
+    inflight: int = 0
+
+
+class ClientPool:
+    """Least-loaded dispatcher over several API endpoints"""
+    
+    def __init__(self, clients, max_per_client=None):
+        """
+        Initialize client pool
+        
+        Args:
+            clients: List of APIClient instances
+            max_per_client: Optional cap on concurrent requests per endpoint
+        """
+        self._slots = [_ClientSlot(client) for client in clients]
+        self._max_per_client = max_per_client
+        self._cond = threading.Condition()
+    
+    def __len__(self):
+        return len(self._slots)
+    
+    @contextmanager
+    def acquire(self):
+        """Borrow the endpoint with the fewest in-flight requests"""
+        with self._cond:
+            while True:
+                slot = min(self._slots, key=lambda s: s.inflight)
+                if self._max_per_client is None or slot.inflight < self._max_per_client:
+                    break
+                self._cond.wait()
+            slot.inflight += 1
+        try:
+            yield slot.client
+        finally:
+            with self._cond:
+                slot.inflight -= 1
+                self._cond.notify()
+
+
 # Utility Functions
 
+_MIME_TYPES = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".webp": "image/webp",
+}
+
+
+def _mime_for(image_path):
+    """Guess image MIME type from file extension (defaults to JPEG)"""
+    return _MIME_TYPES.get(os.path.splitext(image_path)[1].lower(), "image/jpeg")
+
+
 def encode_image(image_path):
     """Encode image file to base64 string"""
     with open(image_path, "rb") as f:
-        return base64.b64encode(f.read()).decode("utf-8")
+        return base64.b64encode(f.read()).decode("ascii")
+
+
+def image_data_uri(image_path):
+    """Build a base64 data URI for an image (cached by path, mtime and size)"""
+    stat = os.stat(image_path)
+    return _image_data_uri_cached(os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size)
+
+
+def cached_data_uri(image_path, image_cache=None):
+    """Look up an image data URI in a per-session cache, encoding on miss"""
+    if image_cache is None:
+        return image_data_uri(image_path)
+    data_uri = image_cache.get(image_path)
+    if data_uri is None:
+        data_uri = image_cache[image_path] = image_data_uri(image_path)
+    return data_uri
+
+
+@functools.lru_cache(maxsize=64)
+def _image_data_uri_cached(image_path, mtime_ns, size):
+    """Encode an image into a full data URI; the stat fields only key the cache"""
+    return "data:" + _mime_for(image_path) + ";base64," + encode_image(image_path)
+
+
+# `\n\s+` also swallows blank lines, so one pass covers both newline rules
+_RE_LINE_BREAKS = re.compile(r'\n\s+')
+_RE_MULTI_SPACES = re.compile(r' {2,}')
+_RE_SCORE = re.compile(r'Overall assessment score\s*:\s*"?\s*(\d+\.?\d*)')
+
+
+def _link_or_copy(src, dst):
+    """Hardlink src to dst when possible, otherwise fall back to a full copy"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        # Cross-device, unsupported filesystem or dst already exists
+        shutil.copy2(src, dst)
 
 
 def compact_text(text):
     """Remove excessive whitespace and line breaks"""
-    text = re.sub(r'\n\s*\n', '\n', text)
-    text = re.sub(r'\n\s+', '\n', text)
-    text = re.sub(r' {2,}', ' ', text)
+    text = _RE_LINE_BREAKS.sub('\n', text)
+    text = _RE_MULTI_SPACES.sub(' ', text)
     return text
 
 
+@functools.lru_cache(maxsize=None)
+def _tag_re(tag):
+    """Compiled pattern matching the content of an XML-style tag"""
+    return re.compile(f'<{tag}>(.*?)</{tag}>', re.DOTALL)
+
+
 def extract_tag_content(text, tag):
     """Extract content from XML-style tags"""
-    pattern = f'<{tag}>(.*?)</{tag}>'
-    match = re.search(pattern, text, re.DOTALL)
+    match = _tag_re(tag).search(text)
     return match.group(1).strip() if match else None
 
 
 def extract_historical_tool_calls(conversation_history):
     """Extract all tool calls from conversation history"""
+    if isinstance(conversation_history, ConversationHistory):
+        return conversation_history.tool_calls_concat
+    
+    # Plain lists (e.g. histories loaded from disk) are scanned
     tool_calls = []
     for entry in conversation_history:
         if tool_call := entry.get('tool_call'):
@@ -169,12 +300,28 @@ def extract_historical_tool_calls(conversation_history):
 
 # Conversation History Management
 
+# Number of most recent rounds kept verbatim; older rounds are compacted
+CONV_WINDOW = 5
+
+# Number of most recent assistant/user exchanges replayed to the model
+MSG_WINDOW = 3
+
+
+class ConversationHistory(list):
+    """Round list that also keeps a running concatenation of its tool calls"""
+    
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.tool_calls_concat = ""
+
+
 class ConversationManager:
     """Manages conversation history storage and retrieval"""
     
     @staticmethod
     def save_round(conversation_history, round_num, messages, full_response, 
-                   current_image, tool_call, output_image=None, success=True):
+                   current_image, tool_call, output_image=None, success=True,
+                   cleaned_messages=None):
         """
         Save single round of conversation
         
@@ -187,6 +334,7 @@ class ConversationManager:
             tool_call: Tool call content
             output_image: Output image path
             success: Whether round succeeded
+            cleaned_messages: Pre-cleaned text-only messages (skips re-cleaning)
             
         Returns:
             Updated conversation history
@@ -196,8 +344,9 @@ class ConversationManager:
         # Extract thinking content
         thinking = extract_tag_content(full_response, 'think')
         
-        # Clean messages (remove image data)
-        cleaned_messages = ConversationManager._clean_messages(messages)
+        # Clean messages (remove image data) unless the caller tracks them
+        if cleaned_messages is None:
+            cleaned_messages = ConversationManager._clean_messages(messages)
         
         round_data = {
             "round": round_num,
@@ -211,8 +360,35 @@ class ConversationManager:
         }
         
         conversation_history.append(round_data)
+        
+        if isinstance(conversation_history, ConversationHistory) and tool_call and tool_call.strip():
+            if conversation_history.tool_calls_concat:
+                conversation_history.tool_calls_concat += " "
+            conversation_history.tool_calls_concat += tool_call.strip()
+        
+        # Compact the round that just fell out of the verbatim window
+        if len(conversation_history) > CONV_WINDOW:
+            ConversationManager._compact_round(conversation_history[-CONV_WINDOW - 1])
+        
         return conversation_history
     
+    @staticmethod
+    def _compact_round(round_data):
+        """Replace bulky round fields with a short summary, keeping tool call and images"""
+        if "summary" in round_data or "round" not in round_data:
+            return
+        
+        full_response = round_data.pop("full_response", None) or ""
+        round_data.pop("input_messages", None)
+        round_data.pop("thinking", None)
+        
+        score_match = _RE_SCORE.search(full_response)
+        round_data["score"] = float(score_match.group(1)) if score_match else None
+        round_data["summary"] = (
+            f"Round {round_data['round']} "
+            f"{'succeeded' if round_data.get('success') else 'failed'}"
+        )
+    
     @staticmethod
     def _clean_messages(messages):
         """Remove image data from messages to reduce storage"""
@@ -239,23 +415,65 @@ class ConversationManager:
         
         return cleaned
     
+    @staticmethod
+    def append_to_log(entries, session_dir):
+        """Append finished rounds to the JSONL checkpoint log"""
+        if not entries:
+            return
+        try:
+            log_file = os.path.join(session_dir, "conversation_history.jsonl")
+            with open(log_file, "a", encoding="utf-8") as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+        except Exception as e:
+            print(f"⚠️ Failed to append conversation log: {e}")
+    
+    @staticmethod
+    def _load_logged_rounds(conversation_history, log_file):
+        """
+        Read the uncompacted copies of the current rounds back from the JSONL log
+        
+        Returns None if the log is missing or does not cover every round in order,
+        in which case the in-memory (possibly compacted) history has to be used.
+        """
+        if not conversation_history or not os.path.exists(log_file):
+            return None
+        with open(log_file, "rb") as f:
+            records = [orjson.loads(line) if orjson else json.loads(line) for line in f if line.strip()]
+        # Appended after any rounds left behind by an interrupted earlier run
+        records = records[-len(conversation_history):]
+        if [r.get("round") for r in records] != [r.get("round") for r in conversation_history]:
+            return None
+        return records
+    
     @staticmethod
     def save_to_file(conversation_history, session_dir):
         """Save complete conversation history to JSON file"""
         try:
             history_file = os.path.join(session_dir, "conversation_history.json")
+            tmp_file = history_file + ".tmp"
+            log_file = os.path.join(session_dir, "conversation_history.jsonl")
+            
+            # Rounds older than CONV_WINDOW are compacted in memory; the log holds them in full
+            full_history = ConversationManager._load_logged_rounds(conversation_history, log_file)
+            if full_history is None:
+                print("⚠️ Conversation log missing or incomplete, saving the in-memory history")
+                full_history = conversation_history
 
-            # Ensure all data is JSON serializable
-            serializable_history = []
-            for conv in conversation_history:
-                serializable_conv = {
-                    k: (v if isinstance(v, (str, list, dict, type(None))) else str(v))
-                    for k, v in conv.items()
-                }
-                serializable_history.append(serializable_conv)
+            # Non-JSON values (e.g. paths) are stringified via default=str
+            if orjson:
+                payload = orjson.dumps(full_history, default=str, option=orjson.OPT_NON_STR_KEYS)
+            else:
+                payload = json.dumps(full_history, default=str, ensure_ascii=False).encode("utf-8")
+            
+            # Write atomically so a crash never leaves a truncated history behind
+            with open(tmp_file, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_file, history_file)
             
-            with open(history_file, "w", encoding="utf-8") as f:
-                json.dump(serializable_history, f, indent=2, ensure_ascii=False)
+            # The per-round log is superseded once the saved history holds every round in full
+            if full_history is not conversation_history:
+                os.remove(log_file)
             
             print(f"✅ Saved conversation history: {history_file}")
         except Exception as e:
@@ -264,18 +482,19 @@ class ConversationManager:
 
 # Reflection Mechanism
 
-def reflect_and_improve(conversation_history, chat_model, image_manager, 
-                       user_instruction, overall_score, default_timeout=180):
+def reflect_and_improve(conversation_history, chat_model, get_image_manager, 
+                       user_instruction, overall_score, default_timeout=180, image_cache=None):
     """
     Reflect on previous attempts and generate improved parameters
     
     Args:
         conversation_history: Previous conversation rounds
         chat_model: API client instance
-        image_manager: Image processing manager
+        get_image_manager: Factory returning the image processing manager
         user_instruction: Original user instruction
         overall_score: Quality score from evaluation
         default_timeout: Request timeout in seconds
+        image_cache: Optional per-session {path: data_uri} cache
         
     Returns:
         Dict with reflection response and re-evaluation
@@ -297,14 +516,21 @@ def reflect_and_improve(conversation_history, chat_model, image_manager,
         
         historical_params = extract_historical_tool_calls(conversation_history)
         
+        # Encode both images concurrently (file reads and base64 release the GIL)
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            original_future = pool.submit(cached_data_uri, original_image, image_cache)
+            latest_future = pool.submit(cached_data_uri, latest_image, image_cache)
+            original_uri = original_future.result()
+            latest_uri = latest_future.result()
+        
         # Build reflection message
         messages = [
             {"role": "system", "content": REFLECT_SYSTEM_PROMPT},
             {
                 "role": "user",
                 "content": [
-                    {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{encode_image(original_image)}"}},
-                    {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{encode_image(latest_image)}"}},
+                    {"type": "image_url", "image_url": {"url": original_uri}},
+                    {"type": "image_url", "image_url": {"url": latest_uri}},
                     {
                         "type": "text",
                         "text": (
@@ -337,7 +563,7 @@ def reflect_and_improve(conversation_history, chat_model, image_manager,
         reflected_image_path = os.path.join(result_dir, "reflected_image.jpg")
         
         if tool_call:
-            processed_path = image_manager.process_image(original_image, tool_call)
+            processed_path = get_image_manager().process_image(original_image, tool_call)
             lua_path = os.path.join(result_dir, "reflected.lua")
             
             # Save Lua preset
@@ -347,7 +573,7 @@ def reflect_and_improve(conversation_history, chat_model, image_manager,
             
         # Copy processed image
         if processed_path and os.path.exists(processed_path):
-            shutil.copy2(processed_path, reflected_image_path)
+            _link_or_copy(processed_path, reflected_image_path)
         
         # Re-evaluate reflected result
         messages.append({
@@ -357,7 +583,7 @@ def reflect_and_improve(conversation_history, chat_model, image_manager,
         messages.append({
             "role": "user",
             "content": [
-                {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{encode_image(reflected_image_path)}"}},
+                {"type": "image_url", "image_url": {"url": cached_data_uri(reflected_image_path, image_cache)}},
                 {"type": "text", "text": "Here is the reflected result. Please evaluate again."}
             ]
         })
@@ -374,14 +600,28 @@ def reflect_and_improve(conversation_history, chat_model, image_manager,
         return None
 
 
-def _save_lua_preset(tool_call_json, output_path):
-    """Convert JSON tool call to Lua preset file"""
+def _parse_tool_call(tool_call_json):
+    """Parse tool call payload: JSON first, Python literal as a fallback"""
     try:
-        json_data = ast.literal_eval(tool_call_json)
-        lua_content = 'return ' + LuaConverter.to_lua(json_data)
+        return orjson.loads(tool_call_json) if orjson else json.loads(tool_call_json)
+    except ValueError:
+        # Models sometimes emit Python-style dicts (single quotes, True/None)
+        return ast.literal_eval(tool_call_json)
+
+
+@functools.lru_cache(maxsize=128)
+def _tool_call_to_lua(tool_call_json):
+    """Convert tool call payload to Lua preset content (cached per payload)"""
+    try:
+        return 'return ' + LuaConverter.to_lua(_parse_tool_call(tool_call_json))
     except Exception as e:
         print(f"⚠️ Lua conversion failed: {e}")
-        lua_content = 'return {}'
+        return 'return {}'
+
+
+def _save_lua_preset(tool_call_json, output_path):
+    """Convert JSON tool call to Lua preset file"""
+    lua_content = _tool_call_to_lua(tool_call_json)
 
     with open(output_path, 'w', encoding='utf-8') as f:
         f.write(lua_content)
@@ -390,7 +630,7 @@ def _save_lua_preset(tool_call_json, output_path):
 # Main Inference Pipeline
 
 def run_inference(image_path, system_prompt, user_prompt, chat_model, 
-                 image_manager, aigc_manager, save_base_path, task_type="lightroom",
+                 get_image_manager, get_aigc_manager, save_base_path, task_type="lightroom",
                  max_rounds=10, quality_threshold=3.0, default_timeout=180):
     """
     Execute multi-round AI-powered image editing
@@ -400,8 +640,8 @@ def run_inference(image_path, system_prompt, user_prompt, chat_model,
         system_prompt: System prompt for model
         user_prompt: User editing instruction
         chat_model: API client instance
-        image_manager: Lightroom processing manager
-        aigc_manager: AIGC processing manager
+        get_image_manager: Factory returning the Lightroom processing manager
+        get_aigc_manager: Factory returning the AIGC processing manager, or None
         save_base_path: Base directory for results
         task_type: Processing mode (lightroom/aigc/auto)
         max_rounds: Maximum number of processing rounds
@@ -414,13 +654,17 @@ def run_inference(image_path, system_prompt, user_prompt, chat_model,
     try:
         # Initialize state
         messages = []
-        conversation_history = []
+        cleaned_messages = []
+        cleaned_head = None
+        image_cache = {}
+        conversation_history = ConversationHistory()
+        logged_rounds = 0
         current_image = None
         evaluation_mode = False
         detected_task_type = task_type if task_type != "auto" else None
 
         # Setup result directories
-        result_dir = os.path.join(save_base_path, image_path.split('/')[-2])
+        result_dir = os.path.join(save_base_path, os.path.basename(os.path.dirname(image_path)))
         multi_round_dir = os.path.join(result_dir, "MR_image")
 
         # Skip if already processed
@@ -434,7 +678,7 @@ def run_inference(image_path, system_prompt, user_prompt, chat_model,
         # Copy original image
         if os.path.exists(image_path):
             original_image = os.path.join(result_dir, os.path.basename(image_path))
-            shutil.copy2(image_path, original_image)
+            _link_or_copy(image_path, original_image)
             current_image = original_image
         
         # Main processing loop
@@ -442,6 +686,10 @@ def run_inference(image_path, system_prompt, user_prompt, chat_model,
             print(f"\n{'=' * 80}")
             print(f"ROUND {round_num}")
             print(f"{'=' * 80}")
+            
+            # Checkpoint rounds finished since the last iteration
+            ConversationManager.append_to_log(conversation_history[logged_rounds:], result_dir)
+            logged_rounds = len(conversation_history)
                         
             # Build messages for current round
             messages = _build_round_messages(
@@ -456,13 +704,21 @@ def run_inference(image_path, system_prompt, user_prompt, chat_model,
             if messages and messages[0]["role"] != "user":
                 messages.insert(0, {"role": "user", "content": f"Analyze image for round {round_num}"})
             
+            # Clean only the messages added this round, or re-sync after the window slid
+            if messages and messages[0] is cleaned_head:
+                cleaned_messages.extend(ConversationManager._clean_messages(messages[len(cleaned_messages):]))
+            else:
+                cleaned_messages = ConversationManager._clean_messages(messages)
+                cleaned_head = messages[0] if messages else None
+            
             try:
                 # Get model response
                 responses = chat_model.chat(
                     messages=messages,
                     system=system_prompt,
                     images=images,
-                    default_timeout=default_timeout
+                    default_timeout=default_timeout,
+                    image_cache=image_cache
                 )
 
                 full_response = responses[0].response_text
@@ -493,7 +749,8 @@ def run_inference(image_path, system_prompt, user_prompt, chat_model,
                 # Save round to history
                 conversation_history = ConversationManager.save_round(
                     conversation_history, round_num, messages, full_response,
-                    current_image, tool_call, success=(tool_call is not None)
+                    current_image, tool_call, success=(tool_call is not None),
+                    cleaned_messages=list(cleaned_messages)
                 )
 
                 # Check for completion
@@ -501,14 +758,14 @@ def run_inference(image_path, system_prompt, user_prompt, chat_model,
                     print(f"✅ Task completed in round {round_num}")
                     
                     # Extract score and reflect if needed
-                    score_match = re.search(r'Overall assessment score\s*:\s*"?\s*(\d+\.?\d*)', full_response)
+                    score_match = _RE_SCORE.search(full_response)
                     if score_match:
                         score = float(score_match.group(1))
                         if score < quality_threshold:
                             print(f"⚠️ Low score ({score}), triggering reflection")
                             reflection_result = reflect_and_improve(
-                                conversation_history, chat_model, image_manager,
-                                user_prompt, score, default_timeout
+                                conversation_history, chat_model, get_image_manager,
+                                user_prompt, score, default_timeout, image_cache
                             )
                             if reflection_result:
                                 conversation_history.append(reflection_result)
@@ -517,7 +774,7 @@ def run_inference(image_path, system_prompt, user_prompt, chat_model,
                 # Process image
                 processed_image = _process_image(
                     tool_call, detected_task_type, current_image,
-                    image_manager, aigc_manager, multi_round_dir,
+                    get_image_manager, get_aigc_manager, multi_round_dir,
                     round_num, os.path.basename(image_path)
                 )
                 
@@ -530,11 +787,13 @@ def run_inference(image_path, system_prompt, user_prompt, chat_model,
                 print(f"❌ Error in round {round_num}: {e}")
                 ConversationManager.save_round(
                     conversation_history, round_num, messages, str(e),
-                    current_image, None, success=False
+                    current_image, None, success=False,
+                    cleaned_messages=list(cleaned_messages)
                 )
                 break
 
         # Save final history
+        ConversationManager.append_to_log(conversation_history[logged_rounds:], result_dir)
         ConversationManager.save_to_file(conversation_history, result_dir)
     
     except Exception as e:
@@ -544,8 +803,9 @@ def run_inference(image_path, system_prompt, user_prompt, chat_model,
 def _build_round_messages(messages, history, round_num, user_prompt, 
                          task_type, evaluation_mode, detected_task_type):
     """Build message list for current round"""
+    instruction = f"<task_type>{task_type}</task_type>. Instruction: {user_prompt}"
     if round_num == 1:
-        return [{"role": "user", "content": f"<task_type>{task_type}</task_type>. Instruction: {user_prompt}"}]
+        return [{"role": "user", "content": instruction}]
     
     # Add previous assistant response
     if history:
@@ -578,6 +838,15 @@ def _build_round_messages(messages, history, round_num, user_prompt,
         prompt = f"Image after step {round_num - 1} of editing."
     
     messages.append({"role": "user", "content": prompt})
+    
+    # Keep the last MSG_WINDOW exchanges verbatim and fold older ones into a summary;
+    # the verbatim exchanges carry the last MSG_WINDOW rounds, so only earlier ones are summarised
+    if len(messages) > 2 * MSG_WINDOW + 1:
+        summary = {
+            "role": "user",
+            "content": f"{instruction}\n\nEarlier rounds summary: {extract_historical_tool_calls(history[:-MSG_WINDOW])}"
+        }
+        messages[:] = [summary] + messages[-2 * MSG_WINDOW:]
     return messages
 
 
@@ -589,8 +858,8 @@ def _prepare_images(round_num, original_image, current_image):
         return [current_image if current_image else original_image]
 
 
-def _process_image(tool_call, task_type, current_image, image_manager, 
-                  aigc_manager, output_dir, round_num, image_filename):
+def _process_image(tool_call, task_type, current_image, get_image_manager, 
+                  get_aigc_manager, output_dir, round_num, image_filename):
     """Process image based on tool call and task type"""
     if not tool_call:
         return current_image
@@ -602,27 +871,62 @@ def _process_image(tool_call, task_type, current_image, image_manager,
         return output_path
     
     # Process based on task type
-    if task_type == "aigc" and aigc_manager:
-        processed = aigc_manager.call_img2img(current_image, tool_call, output_path)
-    elif task_type=="lightroom" and image_manager:
-        processed = image_manager.process_image(current_image, tool_call)
+    processed = None
+    if task_type == "aigc" and get_aigc_manager:
+        processed = get_aigc_manager().call_img2img(current_image, tool_call, output_path)
+    elif task_type=="lightroom" and get_image_manager:
+        processed = get_image_manager().process_image(current_image, tool_call)
         
         # Save Lua preset
         lua_path = os.path.join(output_dir, f"round_{round_num}_processing.lua")
         _save_lua_preset(tool_call, lua_path)
     
-    # Copy to output path
+    # Copy to output path unless the processor already wrote it there
     if processed and os.path.exists(processed):
-        shutil.copy2(processed, output_path)
+        if os.path.abspath(processed) != os.path.abspath(output_path):
+            _link_or_copy(processed, output_path)
         return output_path
     
     return current_image
 
 
+# Lazily created processing managers (one per process)
+
+_MANAGER_LOCK = threading.Lock()
+
+
+@functools.cache
+def _load_lightroom():
+    from utils.lrc_tools import LightroomManager
+    return LightroomManager()
+
+
+@functools.cache
+def _load_aigc(model_path, device):
+    from utils.aigc_tools import AIGCManager
+    return AIGCManager(model_path, device)
+
+
+def get_lightroom():
+    """Return the shared LightroomManager, creating it on first call"""
+    with _MANAGER_LOCK:
+        return _load_lightroom()
+
+
+def get_aigc(model_path, device):
+    """Return the shared AIGCManager, loading the model on first call"""
+    with _MANAGER_LOCK:
+        return _load_aigc(model_path, device)
+
+
 # Batch Processing
 
-def process_single_image(path, image_base_path, chat_model, image_manager, 
-                        aigc_manager, system_prompt, save_base_path, 
+# Candidate input image names, in order of preference
+_INPUT_IMAGE_NAMES = ("before.jpg", "before.png", "input.jpg", "input.png")
+
+
+def process_single_image(path, image_base_path, client_pool, get_image_manager, 
+                        get_aigc_manager, system_prompt, save_base_path, 
                         prompt_file_name, task_type="lightroom",
                         max_rounds=10, quality_threshold=3.0, default_timeout=180):
     """
@@ -631,9 +935,9 @@ def process_single_image(path, image_base_path, chat_model, image_manager,
     Args:
         path: Relative path to image directory
         image_base_path: Base directory containing images
-        chat_model: API client instance
-        image_manager: Lightroom manager
-        aigc_manager: AIGC manager
+        client_pool: ClientPool shared by all workers
+        get_image_manager: Lightroom manager factory
+        get_aigc_manager: AIGC manager factory, or None
         system_prompt: System prompt
         save_base_path: Results directory
         prompt_file_name: User prompt filename
@@ -648,25 +952,24 @@ def process_single_image(path, image_base_path, chat_model, image_manager,
     try:
         base_path = os.path.join(image_base_path, path)
 
+        # Scan the directory once for history, image and prompt files
+        with os.scandir(base_path) as it:
+            files = {entry.name for entry in it if entry.is_file()}
+        
         # Skip if already processed
-        if os.path.exists(os.path.join(base_path, "conversation_history.json")):
+        if "conversation_history.json" in files:
             return f"⏭️ Skipped (already processed): {path}"
         
         # Find image file
-        image_path = os.path.join(base_path, "before.jpg")
-        if not os.path.exists(image_path):
-            for temp_in_Name in ["before.png", "input.jpg", "input.png"]:
-                image_path = os.path.join(base_path, temp_in_Name)
-                if os.path.exists(image_path):
-                    break
-        
-        if not os.path.exists(image_path):
+        image_name = next((name for name in _INPUT_IMAGE_NAMES if name in files), None)
+        if image_name is None:
             return f"⚠️ Skipped (no image): {path}"
+        image_path = os.path.join(base_path, image_name)
         
         # Read user prompt
-        prompt_path = os.path.join(base_path, prompt_file_name)
-        if not os.path.isfile(prompt_path):
+        if prompt_file_name not in files:
             return f"⚠️ Skipped (no prompt): {path}"
+        prompt_path = os.path.join(base_path, prompt_file_name)
         
         try:
             with open(prompt_path, "r", encoding="utf-8") as f:
@@ -678,11 +981,12 @@ def process_single_image(path, image_base_path, chat_model, image_manager,
         thread_id = threading.current_thread().ident
         print(f"[Thread {thread_id}] Processing: {image_path}")
         
-        run_inference(
-            image_path, system_prompt, user_prompt, chat_model,
-            image_manager, aigc_manager, save_base_path, task_type,
-            max_rounds, quality_threshold, default_timeout
-        )
+        with client_pool.acquire() as chat_model:
+            run_inference(
+                image_path, system_prompt, user_prompt, chat_model,
+                get_image_manager, get_aigc_manager, save_base_path, task_type,
+                max_rounds, quality_threshold, default_timeout
+            )
         
         print(f"[Thread {thread_id}] ✅ Completed: {path}")
         return f"✅ Completed: {path}"
@@ -715,8 +1019,10 @@ def main():
                        help="AI model name")
     
     # Processing Configuration
-    parser.add_argument("--max_threads", type=int, default=10, 
-                       help="Maximum concurrent threads")
+    parser.add_argument("--max_threads", type=int, default=None, 
+                       help="Maximum concurrent threads (default: #ports x per_endpoint_concurrency)")
+    parser.add_argument("--per_endpoint_concurrency", type=int, default=4,
+                       help="Maximum concurrent requests per API endpoint (also sizes --max_threads when it is not set)")
     parser.add_argument("--task_type", type=str, default="lightroom", 
                        help="Processing mode: lightroom/aigc/auto")
     
@@ -748,32 +1054,45 @@ def main():
     
     # Initialize API clients
     api_ports = args.api_port if isinstance(args.api_port, list) else [args.api_port]
+    max_threads = args.max_threads or len(api_ports) * args.per_endpoint_concurrency
     chat_models = [
-        APIClient(args.api_endpoint, port, args.model_name, args.api_key, args.api_timeout)
+        APIClient(args.api_endpoint, port, args.model_name, args.api_key, args.api_timeout,
+                  max_connections=max_threads * 2)
         for port in api_ports
     ]
+    client_pool = ClientPool(chat_models, max_per_client=args.per_endpoint_concurrency)
     
-    # Initialize managers
-    image_manager = LightroomManager() 
+    # Managers are created on first use, so unused backends are never loaded
     if args.AIGC_model_pth:
-        aigc_manager = AIGCManager(args.AIGC_model_pth, args.AIGC_device)
+        get_aigc_manager = functools.partial(get_aigc, args.AIGC_model_pth, args.AIGC_device)
     else:
-        aigc_manager = None
+        get_aigc_manager = None
 
     # Get image list
-    image_dirs = sorted(os.listdir(args.image_path))
-    print(f"Processing {len(image_dirs)} images with {args.max_threads} threads")
+    with os.scandir(args.image_path) as it:
+        image_dirs = sorted(entry.name for entry in it if entry.is_dir())
+    
+    # Drop already-finished samples before dispatch (workers keep their own guard)
+    total_dirs = len(image_dirs)
+    image_dirs = [
+        path for path in image_dirs
+        if not os.path.exists(os.path.join(args.save_base_path, path, "conversation_history.json"))
+    ]
+    if total_dirs != len(image_dirs):
+        print(f"⏭️ Skipping {total_dirs - len(image_dirs)} already processed images")
+    print(f"Processing {len(image_dirs)} images with {max_threads} threads "
+          f"across {len(api_ports)} endpoint(s)")
     
     # Process images concurrently
-    with ThreadPoolExecutor(max_workers=args.max_threads) as executor:
+    with ThreadPoolExecutor(max_workers=max_threads) as executor:
         futures = {
             executor.submit(
                 process_single_image, 
                 path, 
                 args.image_path, 
-                chat_models[idx % len(chat_models)],  # Load balancing
-                image_manager, 
-                aigc_manager,
+                client_pool,  # Least-loaded load balancing
+                get_lightroom, 
+                get_aigc_manager,
                 SYSTEM_PROMPT, 
                 args.save_base_path,
                 args.prompt_file_name,
@@ -782,7 +1101,7 @@ def main():
                 args.quality_threshold,
                 args.default_timeout
             ): path
-            for idx, path in enumerate(image_dirs)
+            for path in image_dirs
         }
         
         # Monitor progress
@@ -117,7 +117,9 @@ local function tableToString(t, indent)
     return table.concat(result, "\n")
 end
 
-local function handleRequest(message)
+-- reply(response) sends a message back to the client; process requests use it to
+-- report the final success|requestId|outputPath (or error) once the export finishes
+local function handleRequest(message, reply)
     logger:info("Processing request: " .. tostring(message))
     
     -- Check if message is empty
@@ -141,42 +143,45 @@ local function handleRequest(message)
     end
     
     -- Handle photo request
-    if command == "process" and parts[2] and parts[3] then
-        local photoPath = parts[2]
-        local xmpPath = parts[3]
+    -- Format: process|requestId|photoPath|xmpPath|outputDir
+    -- The request id is echoed back as status|requestId|message
+    if command == "process" and parts[2] and parts[3] and parts[4] then
+        local requestId = parts[2]
+        local photoPath = parts[3]
+        local xmpPath = parts[4]
         
         -- Validate paths and file existence
         if not photoPath or photoPath == "" then
-            return "error|Invalid photo path"
+            return "error|" .. requestId .. "|Invalid photo path"
         end
         
         if not xmpPath or xmpPath == "" then
-            return "error|Invalid XMP path"
+            return "error|" .. requestId .. "|Invalid XMP path"
         end
         
         if not LrFileUtils.exists(photoPath) then
-            return "error|Photo file does not exist"
+            return "error|" .. requestId .. "|Photo file does not exist"
         end
         
         if not LrFileUtils.exists(xmpPath) then
-            return "error|XMP file does not exist"
+            return "error|" .. requestId .. "|XMP file does not exist"
         end
         
         -- Prepare output path
         local outputDir = getParentDir(photoPath)
         if not outputDir then
-            return "error|Failed to get parent directory from path: " .. photoPath
+            return "error|" .. requestId .. "|Failed to get parent directory from path: " .. photoPath
         end
         
         local fileName = LrPathUtils.leafName(photoPath)
         local photoName = LrPathUtils.removeExtension(fileName)
         if not photoName then
-            return "error|Failed to get photo name from path: " .. photoPath
+            return "error|" .. requestId .. "|Failed to get photo name from path: " .. photoPath
         end
         
         local outputPath = LrPathUtils.child(outputDir, photoName .. "_processed.jpg")
         if not outputPath then
-            return "error|Failed to create output path"
+            return "error|" .. requestId .. "|Failed to create output path"
         end
         
         -- Process photo in new async task
@@ -184,6 +189,7 @@ local function handleRequest(message)
             local catalog = LrApplication.activeCatalog()
             if not catalog then
                 logger:error("Failed to get active catalog")
+                reply("error|" .. requestId .. "|Failed to get active catalog")
                 return
             end
             
@@ -210,12 +216,14 @@ local function handleRequest(message)
                 
                 if not success then
                     logger:error("Import operation was cancelled or failed")
+                    reply("error|" .. requestId .. "|Import operation was cancelled or failed")
                     return
                 end
             end
             
             if not photo then
                 logger:error("Could not find or import photo: " .. photoPath)
+                reply("error|" .. requestId .. "|Could not find or import photo")
                 return
             end
             
@@ -258,12 +266,22 @@ local function handleRequest(message)
                 exportSettings = exportSettings
             })
 
-            -- Start the export process on a new task
-            exportSession:doExportOnNewTask()
+            -- Export on this task and report the rendered file once it is written
+            exportSession:doExportOnCurrentTask()
+            for _, rendition in exportSession:renditions() do
+                local success, pathOrMessage = rendition:waitForRender()
+                if success then
+                    logger:info("Export finished: " .. pathOrMessage)
+                    reply("success|" .. requestId .. "|" .. pathOrMessage)
+                else
+                    logger:error("Export failed: " .. tostring(pathOrMessage))
+                    reply("error|" .. requestId .. "|Export failed: " .. tostring(pathOrMessage))
+                end
+            end
             
         end)
         
-        return "processing|Request accepted, processing photo..."
+        return "processing|" .. requestId .. "|Request accepted, processing photo..."
     end
     
     return "error|Invalid request format"
@@ -314,11 +332,18 @@ local function startServer()
                 
                 onMessage = function(socket, message)
                     logger:info("Received message: " .. tostring(message))
-                    local response = LrTasks.pcall(handleRequest, message)
-                    if response then
+                    local function reply(response)
                         logger:info("Sending response: " .. response)
                         socket:send(response .. "\n")
                     end
+                    local ok, response = LrTasks.pcall(handleRequest, message, reply)
+                    if not ok then
+                        logger:error("Request handler failed: " .. tostring(response))
+                        response = "error|" .. tostring(response)
+                    end
+                    if response then
+                        reply(response)
+                    end
                 end,
                 
                 onClosed = function(socket)
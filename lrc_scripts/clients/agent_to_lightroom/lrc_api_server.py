@@ -1,25 +1,75 @@
 import socket
+import selectors
 import os
+import re
 import time
 import threading
-from pathlib import Path
-from http.server import HTTPServer, BaseHTTPRequestHandler
+import uuid
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 import json
 import urllib.parse
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Lightroom 导出图片的扩展名（按优先级排列）
+OUTPUT_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".tif", ".tiff")
+# 请求 id（uuid4 十六进制），用于从插件回复中识别 status|id|message 格式
+REQUEST_ID_RE = re.compile(r'[0-9a-f]{32}')
+# 单个 HTTP 请求最多等待导出完成的时间（秒），实际等待时间由请求中的 wait_timeout 指定
+EXPORT_WAIT_TIMEOUT = 60
+
+# 所有 Lightroom 连接共用一个 selector（Linux 上为 epoll，macOS 上为 kqueue），由单个后台线程分发可读事件
+_selector = selectors.DefaultSelector()
+_selector_lock = threading.Lock()
+_selector_thread = None
+
+def _selector_loop():
+    """响应线程：等待任一连接可读，并调用其注册的回调"""
+    while True:
+        if not _selector.get_map():
+            time.sleep(0.1)
+            continue
+        try:
+            events = _selector.select(timeout=1)
+        except (OSError, ValueError):
+            # 连接在 select 期间被关闭，重新等待
+            continue
+        for key, _ in events:
+            key.data()
+
+def _ensure_selector_thread():
+    """按需启动共享的响应线程"""
+    global _selector_thread
+    with _selector_lock:
+        if _selector_thread is None or not _selector_thread.is_alive():
+            _selector_thread = threading.Thread(target=_selector_loop, daemon=True)
+            _selector_thread.start()
+
 class LightroomAPI:
     def __init__(self, host="127.0.0.1", port=7878):
         self.host = host
         self.port = port
         self.socket = None
-        self.response_thread = None
+        self._recv_buffer = bytearray()  # 尚未凑成完整一行的响应数据
         self.connected = False
         self.last_output_path = None  # 存储最后处理的图片输出路径
+        # HTTP 请求在多个线程中并发处理，串行化 socket 发送
+        self._lock = threading.RLock()
+        # 等待中的请求：request_id -> Future，插件导出完成（success）或失败（error）时由响应线程完成
+        self._pending = {}
+        self._pending_lock = threading.Lock()
     
     def connect(self):
         """建立与服务器的连接"""
         if self.connected:
             return True
+        
+        # 重连前释放旧连接，避免其仍留在 selector 中
+        self.close()
             
         try:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -33,14 +83,19 @@ class LightroomAPI:
                 self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 60)
             if hasattr(socket, 'TCP_KEEPCNT'):
                 self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 5)
+            # 请求/响应都是很短的单行消息，关闭 Nagle 算法避免延迟发送
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            # Linux 上未确认的数据超过 30 秒即判定连接失效
+            if hasattr(socket, 'TCP_USER_TIMEOUT'):
+                self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_USER_TIMEOUT, 30000)
             
             self.socket.connect((self.host, self.port))
+            self._recv_buffer.clear()
             self.connected = True
             
-            # 启动响应处理线程
-            self.response_thread = threading.Thread(target=self._handle_responses)
-            self.response_thread.daemon = True
-            self.response_thread.start()
+            # 注册到共享 selector，由公共响应线程处理
+            _selector.register(self.socket, selectors.EVENT_READ, self._on_readable)
+            _ensure_selector_thread()
             
             return True
         except Exception as e:
@@ -53,52 +108,93 @@ class LightroomAPI:
                     pass
             return False
     
-    def _handle_responses(self):
-        """处理服务器响应"""
-        while self.connected:
-            try:
-                response = self.socket.recv(4096).decode().strip()
-                if not response:
-                    print("Empty response from server")
-                    break
-                
-                print(f"Received response: {response}")
-                status, *message = response.split('|')
-                message = '|'.join(message) if message else ''
-                
-                if status == "success":
-                    print(f"\nPhoto processed successfully!")
-                    if message:
-                        self.last_output_path = message  # 保存输出路径
-                        print(f"Output saved to: {message}")
-                elif status == "error":
-                    self.last_output_path = None
-                    print(f"\nError: {message}")
-                elif status == "pong":
-                    print("Server is alive (received pong)")
-                
-            except socket.timeout:
-                continue
-            except Exception as e:
-                print(f"Error in response handler: {e}")
-                self.connected = False
+    def _on_readable(self):
+        """处理服务器响应（按换行分帧，一次 recv 可能包含多条或半条消息）"""
+        try:
+            data = self.socket.recv(65536)
+        except Exception as e:
+            print(f"Error in response handler: {e}")
+            self._unregister()
+            self.connected = False
+            return
+        if not data:
+            print("Empty response from server")
+            self._unregister()
+            self.connected = False
+            return
+        
+        self._recv_buffer += data
+        while True:
+            end = self._recv_buffer.find(b'\n')
+            if end < 0:
                 break
+            response = self._recv_buffer[:end].decode().strip()
+            del self._recv_buffer[:end + 1]
+            if response:
+                try:
+                    self._dispatch_response(response)
+                except Exception as e:
+                    print(f"Error in response handler: {e}")
+    
+    def _unregister(self):
+        """从共享 selector 中移除当前连接"""
+        if self.socket:
+            try:
+                _selector.unregister(self.socket)
+            except (KeyError, ValueError):
+                pass
+    
+    def _dispatch_response(self, response):
+        """处理单条响应消息（带请求 id 的响应格式为 status|id|message）"""
+        print(f"Received response: {response}")
+        status, *fields = response.split('|')
+        
+        request_id = None
+        if fields and REQUEST_ID_RE.fullmatch(fields[0]):
+            request_id = fields[0]
+            fields = fields[1:]
+        message = '|'.join(fields)
+        
+        # processing 只表示插件已接受请求，Future 保持等待，直到导出完成或失败
+        future = None
+        if request_id is not None and status in ("success", "error"):
+            with self._pending_lock:
+                future = self._pending.pop(request_id, None)
+        
+        if status == "success":
+            print(f"\nPhoto processed successfully!")
+            if message:
+                self.last_output_path = message  # 保存输出路径
+                print(f"Output saved to: {message}")
+            if future is not None:
+                future.set_result(message or None)
+        elif status == "error":
+            print(f"\nError: {message}")
+            if future is not None:
+                future.set_exception(RuntimeError(message))
+        elif status == "pong":
+            print("Server is alive (received pong)")
     
     def send_request(self, message):
         """发送请求到服务器"""
-        if not self.connected and not self.connect():
-            return None
-            
-        try:
-            self.socket.sendall((message + "\n").encode())
-            return True
-        except Exception as e:
-            print(f"Error sending request: {e}")
-            self.connected = False
-            return None
+        with self._lock:
+            if not self.connected and not self.connect():
+                return None
+                
+            try:
+                self.socket.sendall((message + "\n").encode())
+                return True
+            except Exception as e:
+                print(f"Error sending request: {e}")
+                self.connected = False
+                return None
     
-    def process_photo(self, photo_path, xmp_path, output_dir=None):
-        """处理照片"""
+    def process_photo(self, photo_path, xmp_path, output_dir=None, wait_timeout=0):
+        """处理照片
+        
+        wait_timeout > 0 时在该时间内（不超过 EXPORT_WAIT_TIMEOUT）等待插件报告导出完成；
+        为 0 时发送请求后立即返回，由调用方自行等待输出文件
+        """
         # 确保文件存在
         if not os.path.exists(photo_path):
             raise FileNotFoundError(f"Photo file not found: {photo_path}")
@@ -106,61 +202,74 @@ class LightroomAPI:
             raise FileNotFoundError(f"XMP preset file not found: {xmp_path}")
         
         # Lightroom 实际导出位置：原片所在目录下的 processed 子目录
-        photo_path_obj = Path(photo_path).absolute()
-        expected_output_dir = photo_path_obj.parent / "processed"
+        # 路径只计算一次，全程使用 os.path 字符串
+        photo_abs = os.path.abspath(photo_path)
+        xmp_abs = os.path.abspath(xmp_path)
+        stem = os.path.splitext(os.path.basename(photo_abs))[0]
+        expected_output_dir = os.path.join(os.path.dirname(photo_abs), "processed")
         
-        # 清空之前的输出路径
-        self.last_output_path = None
+        # 每个请求使用独立 id，响应线程据此完成对应的 Future，避免并发请求互相覆盖结果
+        request_id = uuid.uuid4().hex
+        future = Future()
+        with self._pending_lock:
+            self._pending[request_id] = future
         
         # 发送给插件的消息（插件当前忽略自定义输出目录参数，但保留以兼容）
-        message = f"process|{str(photo_path_obj)}|{str(Path(xmp_path).absolute())}|{str(expected_output_dir)}"
+        message = f"process|{request_id}|{photo_abs}|{xmp_abs}|{expected_output_dir}"
+        
+        # 等待时间不超过调用方给出的预算，保证在调用方的请求超时之前返回
+        wait_timeout = min(max(wait_timeout, 0), EXPORT_WAIT_TIMEOUT)
+        
+        output_path = None
+        try:
+            result = self.send_request(message)
+            if result:
+                # 插件在导出完成后回复 success|id|path（失败时回复 error），未指定等待时间则只取已到达的回复
+                try:
+                    output_path = future.result(timeout=wait_timeout) if wait_timeout > 0 else (
+                        future.result() if future.done() else None)
+                except FutureTimeoutError:
+                    print(f"Export for request {request_id} not finished within {wait_timeout:.0f}s")
+                except RuntimeError as e:
+                    print(f"Lightroom rejected request {request_id}: {e}")
+                    return None, None
+        finally:
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
         
-        result = self.send_request(message)
         if result:
-            # 等待一小段时间让Lightroom处理完成
-            # import time
-            # time.sleep(5)  # 增加等待时间
-            
-            # 如果Lightroom插件没有返回路径，尝试在实际导出目录中定位文件
-            if not self.last_output_path:
-                import glob
-                stem = photo_path_obj.stem
+            # 如果插件没有（及时）返回路径，尝试在实际导出目录中定位文件
+            if not output_path:
+                # 单次扫描导出目录，收集所有图片文件（DirEntry 缓存 stat 结果）
+                try:
+                    with os.scandir(expected_output_dir) as it:
+                        images = [entry for entry in it
+                                  if entry.is_file() and entry.name.lower().endswith(OUTPUT_IMAGE_EXTENSIONS)]
+                except FileNotFoundError:
+                    images = []
+                names = {entry.name: entry for entry in images}
                 # 优先尝试与原文件同名的导出文件
-                preferred_candidates = [
-                    expected_output_dir / f"{stem}.jpg",
-                    expected_output_dir / f"{stem}.jpeg",
-                    expected_output_dir / f"{stem}.tif",
-                    expected_output_dir / f"{stem}.tiff",
-                ]
-                for candidate in preferred_candidates:
-                    if candidate.exists():
-                        self.last_output_path = str(candidate)
-                        print(f"Found expected output file: {self.last_output_path}")
+                for ext in OUTPUT_IMAGE_EXTENSIONS:
+                    if f"{stem}{ext}" in names:
+                        output_path = names[f"{stem}{ext}"].path
+                        print(f"Found expected output file: {output_path}")
                         break
                 # 如果未直接命中，回退到该目录下最新的图片文件
-                if not self.last_output_path:
-                    possible_patterns = [
-                        str(expected_output_dir / "*.jpg"),
-                        str(expected_output_dir / "*.jpeg"),
-                        str(expected_output_dir / "*.tif"),
-                        str(expected_output_dir / "*.tiff"),
-                    ]
-                    matches = []
-                    for pattern in possible_patterns:
-                        matches.extend(glob.glob(pattern))
-                    if matches:
-                        self.last_output_path = max(matches, key=lambda x: Path(x).stat().st_mtime)
-                        print(f"Found output file by latest mtime: {self.last_output_path}")
+                if not output_path and images:
+                    output_path = max(images, key=lambda entry: entry.stat().st_mtime).path
+                    print(f"Found output file by latest mtime: {output_path}")
                 # 如果还是没找到，作为最后兜底，返回预期命名路径（不一定存在）
-                if not self.last_output_path:
-                    self.last_output_path = str(expected_output_dir / f"{stem}.jpg")
-                    print(f"Using expected (fallback) output path: {self.last_output_path}")
+                if not output_path:
+                    output_path = os.path.join(expected_output_dir, f"{stem}.jpg")
+                    print(f"Using expected (fallback) output path: {output_path}")
+            self.last_output_path = output_path
         
-        return result, self.last_output_path
+        return result, output_path
     
     def close(self):
         """关闭连接"""
         self.connected = False
+        self._unregister()
         if self.socket:
             try:
                 self.socket.close()
@@ -183,10 +292,25 @@ def test_server_connection(api):
     return False
 
 class PhotoProcessHandler(BaseHTTPRequestHandler):
+    # 较大的读写缓冲，减少上传/响应时的系统调用次数（wfile 在请求结束时统一 flush）
+    rbufsize = 64 * 1024
+    wbufsize = 64 * 1024
+    
     def do_POST(self):
         content_length = int(self.headers['Content-Length'])
-        post_data = self.rfile.read(content_length)
-        data = json.loads(post_data.decode('utf-8'))
+        # 直接读入预分配的缓冲区，避免额外的 bytes 拷贝
+        post_data = bytearray(content_length)
+        view = memoryview(post_data)
+        received = 0
+        while received < content_length:
+            n = self.rfile.readinto(view[received:])
+            if not n:
+                break
+            received += n
+        view.release()
+        del post_data[received:]
+        # json.loads 可直接解析 bytes，无需先解码
+        data = orjson.loads(post_data) if orjson else json.loads(post_data)
         
         photo_path = data.get('photo_path')
         xmp_path = data.get('xmp_path')
@@ -204,7 +328,9 @@ class PhotoProcessHandler(BaseHTTPRequestHandler):
             else:
                 output_dir = f"/tmp/lightroom_processed/{task_id}"
             
-            result, output_path = self.server.lightroom_api.process_photo(photo_path, xmp_path, output_dir)
+            # 调用方可指定最多等待导出完成的秒数，默认立即返回
+            wait_timeout = float(data.get('wait_timeout') or 0)
+            result, output_path = self.server.lightroom_api.process_photo(photo_path, xmp_path, output_dir, wait_timeout)
             if result:
                 response_data = {
                     "status": "success",
@@ -215,7 +341,7 @@ class PhotoProcessHandler(BaseHTTPRequestHandler):
                 self.send_response(200)
                 self.send_header('Content-type', 'application/json')
                 self.end_headers()
-                self.wfile.write(json.dumps(response_data).encode())
+                self.wfile.write(orjson.dumps(response_data) if orjson else json.dumps(response_data).encode())
             else:
                 self.send_error(500, "Failed to process photo")
         except Exception as e:
@@ -223,7 +349,7 @@ class PhotoProcessHandler(BaseHTTPRequestHandler):
 
 def run_http_server(api, port=7777):
     """运行HTTP服务器"""
-    server = HTTPServer(('localhost', port), PhotoProcessHandler)
+    server = ThreadingHTTPServer(('localhost', port), PhotoProcessHandler)
     server.lightroom_api = api  # 将API实例附加到服务器
     print(f"Starting HTTP server on port {port}")
     server.serve_forever()
@@ -1,4 +1,5 @@
 import requests
+from requests_toolbelt.multipart.encoder import MultipartEncoder
 import json
 from PIL import Image
 import yaml
@@ -39,15 +40,16 @@ def send_photo_request_local(photo_path, lua_path, url, timeout):
 
 def send_photo_request_remote(photo_path, lua_path, url, timeout):
     """Send request with file uploads (remote mode)"""
-    # Validate files exist
-    if not os.path.exists(photo_path):
+    # Validate files exist and get their sizes with a single stat per file
+    try:
+        photo_size = os.stat(photo_path).st_size
+    except FileNotFoundError:
         raise FileNotFoundError(f"Photo file not found: {photo_path}")
-    if not os.path.exists(lua_path):
+    try:
+        lua_size = os.stat(lua_path).st_size
+    except FileNotFoundError:
         raise FileNotFoundError(f"Lua file not found: {lua_path}")
     
-    # Get file sizes for progress tracking
-    photo_size = os.path.getsize(photo_path)
-    lua_size = os.path.getsize(lua_path)
     total_size = photo_size + lua_size
     
     print(f"Sending request in remote mode (uploading files)...")
@@ -55,26 +57,17 @@ def send_photo_request_remote(photo_path, lua_path, url, timeout):
     print(f"Lua: {os.path.basename(lua_path)} ({lua_size:,} bytes)")
     print(f"Total upload size: {total_size:,} bytes")
     
-    # Prepare multipart form data
-    files = {
-        'photo_file': (os.path.basename(photo_path), open(photo_path, 'rb')),
-        'lua_file': (os.path.basename(lua_path), open(lua_path, 'rb'))
-    }
-    
-    data = {
-        'mode': 'upload',
-        'photo_filename': os.path.basename(photo_path),
-        'lua_filename': os.path.basename(lua_path)
-    }
-    
-    try:
-        response = requests.post(url, files=files, data=data, timeout=timeout)
-        return response
-    finally:
-        # Always close file handles
-        for file_tuple in files.values():
-            if hasattr(file_tuple[1], 'close'):
-                file_tuple[1].close()
+    # Stream the multipart body from disk instead of building it in memory
+    with open(photo_path, 'rb') as photo_file, open(lua_path, 'rb') as lua_file:
+        fields = {
+            'mode': 'upload',
+            'photo_filename': os.path.basename(photo_path),
+            'lua_filename': os.path.basename(lua_path),
+            'photo_file': (os.path.basename(photo_path), photo_file, 'application/octet-stream'),
+            'lua_file': (os.path.basename(lua_path), lua_file, 'application/octet-stream')
+        }
+        encoder = MultipartEncoder(fields=fields)
+        return requests.post(url, data=encoder, headers={'Content-Type': encoder.content_type}, timeout=timeout)
 
 def send_photo_request(photo_path, lua_path, url=None, timeout=None):
     """Main function that automatically chooses local or remote mode"""
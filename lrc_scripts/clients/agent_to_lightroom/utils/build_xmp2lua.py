@@ -0,0 +1,21 @@
+"""
+Optionally compile xmp2lua.py to a native extension with Cython.
+
+Usage: python build_xmp2lua.py build_ext --inplace
+
+The resulting extension module shadows xmp2lua.py on import; delete it to go back
+to the pure-Python module. Type declarations live in xmp2lua.pxd.
+"""
+import os
+from setuptools import setup
+from Cython.Build import cythonize
+
+here = os.path.dirname(os.path.abspath(__file__))
+
+setup(
+    name="xmp2lua",
+    ext_modules=cythonize(
+        os.path.join(here, "xmp2lua.py"),
+        compiler_directives={"language_level": 3},
+    ),
+)
@@ -0,0 +1,133 @@
+"""
+Differential checks for the optimised xmp2lua.py.
+
+Usage: python check_xmp2lua.py [--cases N] [--seed S] [xmp_file_or_dir ...]
+
+1. Value formatting: parse_value and every typed emitter in _VALUE_EMITTERS are
+   fuzzed against the original parse_value (kept below as reference_parse_value)
+   on N random attribute strings.
+2. Parser backends: for each given XMP file (directories are scanned for *.xmp),
+   the output of the lxml backend is compared with the stdlib ElementTree backend.
+   Skipped when lxml is not installed.
+
+Exits with status 1 on any mismatch.
+"""
+import argparse
+import glob
+import importlib.util
+import os
+import random
+import sys
+
+here = os.path.dirname(os.path.abspath(__file__))
+XMP2LUA_PATH = os.path.join(here, "xmp2lua.py")
+
+
+def reference_parse_value(value):
+    """parse_value as it was before the typed emitters and dispatch regexes"""
+    if value.startswith('+'):
+        value = value[1:]
+
+    try:
+        num = float(value)
+        if num.is_integer():
+            return str(int(num))
+        return str(num)
+    except ValueError:
+        # Handle boolean values
+        if value.lower() == 'true':
+            return 'true'
+        if value.lower() == 'false':
+            return 'false'
+        # Return string values with quotes
+        return f'"{value}"'
+
+
+def load_xmp2lua(name, use_lxml=True):
+    """Load xmp2lua.py (never a compiled extension) under `name`, optionally hiding lxml"""
+    hidden = {}
+    if not use_lxml:
+        for key in [k for k in sys.modules if k == 'lxml' or k.startswith('lxml.')]:
+            hidden[key] = sys.modules.pop(key)
+        sys.modules['lxml'] = None  # makes `from lxml import etree` raise ImportError
+    try:
+        spec = importlib.util.spec_from_file_location(name, XMP2LUA_PATH)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    finally:
+        if not use_lxml:
+            del sys.modules['lxml']
+            sys.modules.update(hidden)
+
+
+def random_value(rng):
+    """An attribute string: mostly number-like, with signs, exponents, words and junk mixed in"""
+    kind = rng.randrange(6)
+    if kind == 0:
+        return str(rng.randint(-10 ** rng.randint(1, 18), 10 ** rng.randint(1, 18)))
+    if kind == 1:
+        return repr(rng.uniform(-1000, 1000))
+    if kind == 2:
+        return rng.choice(['True', 'False', 'true', 'false', 'TRUE', 'inf', '-inf', 'nan', 'NaN',
+                           'Infinity', '', ' ', '1e400', '-0', '0.0', '+0', '1_000', '٣'])
+    if kind == 3:
+        return rng.choice(['', '+', '-']) + f"{rng.uniform(0, 100):.{rng.randint(0, 6)}f}"
+    alphabet = " +-.0123456789eEinfatruslINFTx_"
+    return ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+
+
+def check_values(cases, seed):
+    import_name = "xmp2lua_check"
+    module = load_xmp2lua(import_name)
+    emitters = [("parse_value", module.parse_value)] + sorted(module._VALUE_EMITTERS.items())
+    rng = random.Random(seed)
+    mismatches = 0
+    for _ in range(cases):
+        value = random_value(rng)
+        expected = reference_parse_value(value)
+        key, emit = rng.choice(emitters)
+        got = emit(value)
+        if got != expected:
+            mismatches += 1
+            if mismatches <= 10:
+                print(f"value mismatch [{key}] {value!r}: {got!r} != {expected!r}")
+    print(f"values: {cases} cases over {len(emitters)} formatters, {mismatches} mismatches")
+    return mismatches == 0
+
+
+def check_backends(paths):
+    try:
+        import lxml  # noqa: F401
+    except ImportError:
+        print("backends: lxml not installed, skipped")
+        return True
+    with_lxml = load_xmp2lua("xmp2lua_lxml", use_lxml=True)
+    with_stdlib = load_xmp2lua("xmp2lua_stdlib", use_lxml=False)
+    files = []
+    for path in paths:
+        files.extend(sorted(glob.glob(os.path.join(path, "*.xmp"))) if os.path.isdir(path) else [path])
+    mismatches = 0
+    for xmp_file in files:
+        if with_lxml.parse_xmp(xmp_file) != with_stdlib.parse_xmp(xmp_file):
+            mismatches += 1
+            print(f"backend mismatch: {xmp_file}")
+    print(f"backends: {len(files)} files, {mismatches} mismatches")
+    return mismatches == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Differential checks for xmp2lua.py")
+    parser.add_argument("paths", nargs="*", help="XMP files or directories for the backend comparison")
+    parser.add_argument("--cases", type=int, default=300000, help="Random values to check (default: 300000)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    args = parser.parse_args()
+
+    ok = check_values(args.cases, args.seed)
+    if args.paths:
+        ok = check_backends(args.paths) and ok
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
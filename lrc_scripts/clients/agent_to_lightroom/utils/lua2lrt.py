@@ -1,123 +1,113 @@
 import re
 import random
-import string
 import os
+import bisect
 from lua_exchange import LuaExchange
 
+# Lightroom Temperature/Tint -> incremental slider value mapping tables
+_TEMP_MAP = {
+    2000: -100, 2500: -71, 3000: -49, 3500: -33, 4000: -20, 4500: -9, 5000: 0,
+    5500: 8, 6000: 14, 6500: 20, 7000: 25, 7500: 30, 8000: 34, 8500: 38, 9000: 41,
+    9500: 44, 10000: 47, 10500: 50, 20000: 78, 30000: 89, 40000: 96, 50000: 100
+}
+_TINT_MAP = {
+    -150: -100, -140: -96, -130: -92, -120: -88, -110: -83, -100: -78,
+    -90: -74, -70: -63, -50: -51, -40: -45, -20: -30, 0: -11, 10: 1,
+    30: 22, 50: 39, 70: 54, 80: 60, 90: 67, 100: 73, 120: 84, 140: 95,
+    150: 100
+}
+
+# Reverse mappings and their sorted keys, built once at import
+_TEMP_REVERSE_MAP = {v: k for k, v in _TEMP_MAP.items()}
+_TEMP_REVERSE_KEYS = tuple(sorted(_TEMP_REVERSE_MAP))
+_TINT_REVERSE_MAP = {v: k for k, v in _TINT_MAP.items()}
+_TINT_REVERSE_KEYS = tuple(sorted(_TINT_REVERSE_MAP))
+
+# Curve tables with indexed entries (all eight curve keys in one alternation)
+_CURVE_RE = re.compile(
+    r'(?P<key>ToneCurvePV2012(?:Red|Green|Blue)?|MainCurve|RedCurve|GreenCurve|BlueCurve)'
+    r'\s*=\s*\{[^{}]*(?:\[\d+\][^{}]*)+\}'
+)
+# Curve tables and line breaks, for render_settings
+_SETTINGS_TOKEN_RE = re.compile(_CURVE_RE.pattern + r'|\n')
+_CURVE_VALUE_RE = re.compile(r'\[\d+\]\s*=\s*(-?\d+(?:\.\d+)?)')
+# Custom white balance is the only case transform_json_obj rewrites
+_CUSTOM_WB_RE = re.compile(r'''WhiteBalance["'\]]*\s*=\s*["']Custom["']''')
+
 def generate_random_hash(length=5):
     """Generate a random hash string of specified length"""
-    return ''.join(random.choices(string.hexdigits, k=length)).upper()
+    return random.randbytes((length + 1) // 2).hex()[:length].upper()
 
-def convert_curve_format(curve_data):
+def render_settings(content):
     """
-    Convert curve data from lua format with indexed keys to lrtemplate format.
+    Turn a serialized Lua table into lrtemplate settings lines in one pass.
     
-    Input format: [1] = 0, [2] = 19, ...
-    Output format: 0, 19, ...
+    Drops the outer curly braces, rewrites indexed curve tables ([1] = 0, ...)
+    as flat value lists and indents every non-blank line for the settings block.
     """
-    # Extract values using regex
-    values = []
-    pattern = r'\[\d+\]\s*=\s*(-?\d+(?:\.\d+)?)'
-    matches = re.findall(pattern, curve_data)
-    
-    if not matches:
-        return "{}"
-    
-    # Format as lrtemplate style
-    formatted_values = []
-    for value in matches:
-        formatted_values.append(f"\t\t\t{value}")
-    
-    return "{\n" + ",\n".join(formatted_values) + ",\n\t\t}"
-    
-def process_lua_content(content):
-    """Process lua content and extract/transform the required data"""
-    # Find all curve data that needs conversion
-    curve_keys = [
-        'ToneCurvePV2012', 
-        'ToneCurvePV2012Red', 
-        'ToneCurvePV2012Green', 
-        'ToneCurvePV2012Blue',
-        'MainCurve',
-        'RedCurve',
-        'GreenCurve',
-        'BlueCurve'
-    ]
-    
-    # Extract each curve section and convert it
-    for key in curve_keys:
-        pattern = fr'{key}\s*=\s*\{{[^{{}}]*(\[\d+\][^{{}}]*)+\}}'
-        match = re.search(pattern, content)
-        if match:
-            curve_section = match.group(0)
-            curve_data = curve_section[curve_section.find('{')+1:curve_section.rfind('}')]
-            converted_curve = convert_curve_format(curve_data)
-            
-            # Replace the original curve data with the converted format
-            content = content.replace(curve_section, f"{key} = {converted_curve}")
-    
-    return content
-
-def fix_indentation(content):
-    """Fix the indentation of the content to match lrtemplate format"""
-    # Split by lines
-    lines = content.split('\n')
-    indented_lines = []
-    
-    # Add proper indentation
-    for line in lines:
-        line = line.strip()
+    # Drop the outer curly braces
+    body = content.strip()
+    if body.startswith('{'):
+        body = body[1:]
+    if body.endswith('}'):
+        body = body[:-1]
+    
+    lines = []
+    current = []
+    
+    def flush():
+        line = ''.join(current).strip()
         if line:
-            indented_lines.append(f"\t\t\t{line}")
-    
-    return '\n'.join(indented_lines)
-
-def cleanup_content(content):
-    """Clean up the content to remove extra curly braces and fix formatting"""
-    # Remove the opening curly brace at the beginning if present
-    content = re.sub(r'^\s*{\s*', '', content)
-    
-    # Remove the closing curly brace at the end if present
-    content = re.sub(r'\s*}\s*$', '', content)
-    
-    return content
+            lines.append(f"\t\t\t{line}")
+        current.clear()
+    
+    pos = 0
+    for match in _SETTINGS_TOKEN_RE.finditer(body):
+        current.append(body[pos:match.start()])
+        pos = match.end()
+        key = match.group('key')
+        if key is None:
+            # Plain line break
+            flush()
+            continue
+        
+        # Curve table: emit indexed values as a flat list
+        curve_section = match.group(0)
+        values = _CURVE_VALUE_RE.findall(curve_section[curve_section.find('{')+1:curve_section.rfind('}')])
+        if not values:
+            current.append(f"{key} = {{}}")
+            continue
+        current.append(f"{key} = {{")
+        flush()
+        lines.extend(f"\t\t\t{value}," for value in values)
+        current.append('}')
+    
+    current.append(body[pos:])
+    flush()
+    return '\n'.join(lines)
 
 def reverse_map_temperature_tint(mapped_value, type='temperature'):
-    # Create reverse mapping tables
-    temp_map = {
-        2000: -100, 2500: -71, 3000: -49, 3500: -33, 4000: -20, 4500: -9, 5000: 0,
-        5500: 8, 6000: 14, 6500: 20, 7000: 25, 7500: 30, 8000: 34, 8500: 38, 9000: 41,
-        9500: 44, 10000: 47, 10500: 50, 20000: 78, 30000: 89, 40000: 96, 50000: 100
-    }
-    tint_map = {
-        -150: -100, -140: -96, -130: -92, -120: -88, -110: -83, -100: -78,
-        -90: -74, -70: -63, -50: -51, -40: -45, -20: -30, 0: -11, 10: 1,
-        30: 22, 50: 39, 70: 54, 80: 60, 90: 67, 100: 73, 120: 84, 140: 95,
-        150: 100
-    }
-    
-    # Select mapping table and create reverse mapping
-    original_map = temp_map if type == 'temperature' else tint_map
-    reverse_map = {v: k for k, v in original_map.items()}
+    # Select precomputed reverse mapping table
+    if type == 'temperature':
+        reverse_map, keys = _TEMP_REVERSE_MAP, _TEMP_REVERSE_KEYS
+    else:
+        reverse_map, keys = _TINT_REVERSE_MAP, _TINT_REVERSE_KEYS
     
     # If input value exists in reverse mapping, return directly
     if mapped_value in reverse_map:
         return reverse_map[mapped_value]
     
-    # Find the two closest values for linear interpolation
-    keys = sorted(reverse_map.keys())
+    # Clamp values outside the table
     if mapped_value < keys[0]:
         return reverse_map[keys[0]]
     if mapped_value > keys[-1]:
         return reverse_map[keys[-1]]
     
-    # Find the two closest values
-    for i in range(len(keys)-1):
-        if keys[i] <= mapped_value <= keys[i+1]:
-            # Linear interpolation
-            x1, x2 = keys[i], keys[i+1]
-            y1, y2 = reverse_map[x1], reverse_map[x2]
-            return y1 + (y2 - y1) * (mapped_value - x1) / (x2 - x1)
+    # Linear interpolation between the two closest values
+    i = bisect.bisect_left(keys, mapped_value)
+    x1, x2 = keys[i-1], keys[i]
+    y1, y2 = reverse_map[x1], reverse_map[x2]
+    return y1 + (y2 - y1) * (mapped_value - x1) / (x2 - x1)
 
 def transform_json_obj(json_obj):
     # Convert IncrementalTemperature and IncrementalTint to Temperature and Tint
@@ -147,19 +137,15 @@ def lua_to_lrtemplate(lua_file_path, output_path=None):
     # Remove the "return" at the beginning if present
     content = re.sub(r'^return\s*', '', content.strip())
 
-    # transform incre-temperature and incre-tint to temperature and tint
-    json_obj = LuaExchange.from_lua(content)
-    transformed_json_obj = transform_json_obj(json_obj)
-    content = LuaExchange.to_lua(transformed_json_obj)
-    
-    # Clean up the content
-    content = cleanup_content(content)
+    # transform incre-temperature and incre-tint to temperature and tint;
+    # without a custom white balance there is nothing to remap, so skip the round-trip
+    if _CUSTOM_WB_RE.search(content):
+        json_obj = LuaExchange.from_lua(content)
+        transformed_json_obj = transform_json_obj(json_obj)
+        content = LuaExchange.to_lua(transformed_json_obj)
     
-    # Process the content to convert curve formats
-    processed_content = process_lua_content(content)
-    
-    # Fix indentation for the entire content
-    processed_content = fix_indentation(processed_content)
+    # Strip outer braces, convert curve formats and fix indentation in one pass
+    processed_content = render_settings(content)
     
     # Generate random hash for internalName
     random_hash = generate_random_hash(5)
@@ -185,24 +171,63 @@ def lua_to_lrtemplate(lua_file_path, output_path=None):
     
     return output_path
 
+def _convert_one(paths):
+    """Picklable wrapper around lua_to_lrtemplate for process pools"""
+    input_file, output_file = paths
+    return lua_to_lrtemplate(input_file, output_file)
+
+def convert_batch(input_files, output_dir=None, max_workers=None):
+    """Convert several lua files in parallel, one process per core"""
+    from concurrent.futures import ProcessPoolExecutor
+    
+    pairs = []
+    for input_file in input_files:
+        output_file = None
+        if output_dir:
+            base_name = os.path.splitext(os.path.basename(input_file))[0]
+            output_file = os.path.join(output_dir, f"{base_name}.lrtemplate")
+        pairs.append((input_file, output_file))
+    
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_convert_one, pairs, chunksize=max(1, len(pairs) // 64)))
+
 if __name__ == "__main__":
     import sys
+    import glob
     
     if len(sys.argv) < 2:
         print("Usage: python lua2lrt.py <input_lua_file> [output_lrtemplate_file]")
+        print("       python lua2lrt.py <input_dir | glob_pattern> [output_dir]")
         sys.exit(1)
     
     input_file = sys.argv[1]
     output_file = None
     
-    # If a second argument is provided, use it as the output file path
+    # If a second argument is provided, use it as the output file path (output directory in batch mode)
     # Otherwise, use the same path as input but with .lrtemplate extension
     if len(sys.argv) > 2:
         output_file = sys.argv[2]
     
+    # A directory or glob pattern converts every matching lua file in parallel
+    if os.path.isdir(input_file) or glob.has_magic(input_file):
+        pattern = os.path.join(input_file, "*.lua") if os.path.isdir(input_file) else input_file
+        input_files = sorted(glob.glob(pattern))
+        if not input_files:
+            print(f"No lua files found for: {input_file}")
+            sys.exit(1)
+        try:
+            output_paths = convert_batch(input_files, output_file)
+            print(f"Conversion successful! {len(output_paths)} presets converted.")
+        except Exception as e:
+            print(f"Error during conversion: {e}")
+            sys.exit(1)
+        sys.exit(0)
+    
     try:
         output_path = lua_to_lrtemplate(input_file, output_file)
         print(f"Conversion successful! Output saved to: {output_path}")
     except Exception as e:
         print(f"Error during conversion: {e}")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
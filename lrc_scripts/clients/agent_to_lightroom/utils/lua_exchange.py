@@ -1,60 +1,59 @@
 import re
 
+_PAIR_MAP = {
+    '\'': '\'',
+    '"': '"',
+    '[': ']',
+    '{': '}',
+}
+# Every character that can open/close a pair or act as a key character
+_DELIMITER_RE = re.compile(r'''[\[\]{}"',=]''')
+# Long comments (--[[ ... ]]) first, then line comments (-- ...)
+_COMMENT_RE = re.compile(r'--\s*?\[\[[\s\S]*?\]\]|--.*')
+# Numeric scalars: integer, float (either side of the dot may be empty), hex
+_INT_RE = re.compile(r'-?\d+\Z')
+_FLOAT_RE = re.compile(r'-?(?:\d+\.\d*|\.\d+)\Z')
+_HEX_RE = re.compile(r'0x[0-9A-Fa-f]+\Z')
+
 
 class LuaExchange:
     @staticmethod
     def _close_find(content, key_char, start=0):
-        result = -1
-        offset = start
-        pair_map = {
-            '\'': '\'',
-            '"': '"',
-            '[': ']',
-            '{': '}',
-        }
+        # Only delimiters can change the scan state, so let the regex engine
+        # skip everything else and inspect just those positions.
         pair_temp = []
-        char = ''
 
-        while offset < len(content):
-            char_prev = char
+        for match in _DELIMITER_RE.finditer(content, start):
+            offset = match.start()
             char = content[offset]
-            if not char.isspace():
-                if len(pair_temp) > 0:
-                    last_pair_char = pair_temp[-1]
-                    if char == last_pair_char:
-                        pair_temp.pop()
-                    elif char_prev != '\\' and char == '{' and last_pair_char == '}':
-                        pair_temp.append(pair_map[char])
-                else:
-                    if char_prev != '\\' and char in pair_map:
-                        pair_temp.append(pair_map[char])
-                    elif char == key_char:
-                        result = offset
-                        break
-            offset += 1
+            char_prev = content[offset - 1] if offset > start else ''
+            if len(pair_temp) > 0:
+                last_pair_char = pair_temp[-1]
+                if char == last_pair_char:
+                    pair_temp.pop()
+                elif char_prev != '\\' and char == '{' and last_pair_char == '}':
+                    pair_temp.append('}')
+            else:
+                if char_prev != '\\' and char in _PAIR_MAP:
+                    pair_temp.append(_PAIR_MAP[char])
+                elif char == key_char:
+                    return offset
 
-        return result
+        return -1
 
     @staticmethod
     def from_lua(content: str, level=0):
         content = content.strip()
         if level == 0:
-            notes = re.findall('--\s*?\[\[[\s\S]*?\]\]', content)
-            for note in notes:
-                content = content.replace(note, '')
-            notes = re.findall('--.*', content)
-            for note in notes:
-                content = content.replace(note, '')
+            content = _COMMENT_RE.sub('', content)
 
         if len(content) == 0:
             raise Exception('Couldn\' t analyze blank content.')
-        elif (content.count('-') == 0 or (content.count('-') == 1 and content[0] == '-')) \
-                and content.replace('-', '').isnumeric():
+        elif _INT_RE.match(content):
             return int(content)
-        elif (content.count('-') == 0 or (content.count('-') == 1 and content[0] == '-')) \
-                and content.count('.') <= 1 and content.replace('-', '').replace('.', '').isnumeric():
+        elif _FLOAT_RE.match(content):
             return float(content)
-        elif content[:2] == '0x' and content.replace('0x', '').isalnum():
+        elif _HEX_RE.match(content):
             return int(content, 16)
         elif content == 'false':
             return False
@@ -113,14 +112,12 @@ class LuaExchange:
 
     @staticmethod
     def to_lua(obj, indent='    ', level=0):
-        result = ''
-
         if isinstance(obj, bool):
-            result = str(obj).lower()
+            return str(obj).lower()
         elif type(obj) in [int, float]:
-            result = str(obj)
+            return str(obj)
         elif isinstance(obj, str):
-            result = '"%s"' % obj
+            return '"%s"' % obj
         elif type(obj) in [list, tuple]:
             is_simple_list = True
             for i in obj:
@@ -129,35 +126,27 @@ class LuaExchange:
                     break
 
             if is_simple_list:
-                for i in obj:
-                    if result != '':
-                        result += ', '
-                    result += LuaExchange.to_lua(i, level=level)
-                result = '{%s}' % result
+                parts = [LuaExchange.to_lua(i, level=level) for i in obj]
+                return '{%s}' % ', '.join(parts)
             else:
                 level += 1
-                for i in obj:
-                    if result != '':
-                        result += ',\n'
-                    result += (indent * level) + LuaExchange.to_lua(i, level=level)
-                result = '{\n%s\n%s}' % (result, indent * (level - 1))
+                prefix = indent * level
+                parts = [prefix + LuaExchange.to_lua(i, level=level) for i in obj]
+                return '{\n%s\n%s}' % (',\n'.join(parts), indent * (level - 1))
         elif isinstance(obj, dict):
             level += 1
+            prefix = indent * level
+            parts = []
             for k, v in obj.items():
-                if result != '':
-                    result += ',\n'
-                result += (indent * level)
                 if isinstance(k, str):
                     # Check if the key contains special characters or is not a valid identifier
                     if not k.isidentifier() or '-' in k or '.' in k:
-                        result += '[%s] = ' % LuaExchange.to_lua(k, level=level)
+                        key = '[%s]' % LuaExchange.to_lua(k, level=level)
                     else:
-                        result += '%s = ' % k
+                        key = k
                 else:
-                    result += '[%s] = ' % LuaExchange.to_lua(k, level=level)
-                result += LuaExchange.to_lua(v, level=level)
-            result = '{\n%s\n%s}' % (result, indent * (level - 1))
+                    key = '[%s]' % LuaExchange.to_lua(k, level=level)
+                parts.append('%s%s = %s' % (prefix, key, LuaExchange.to_lua(v, level=level)))
+            return '{\n%s\n%s}' % (',\n'.join(parts), indent * (level - 1))
         else:
-            result = 'nil'
-
-        return result
\ No newline at end of file
+            return 'nil'
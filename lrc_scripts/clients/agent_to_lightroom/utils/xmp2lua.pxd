@@ -0,0 +1,28 @@
+# Cython declarations for xmp2lua.py (pure-Python mode); used only when the module
+# is compiled with build_xmp2lua.py, the .py file keeps working unchanged without it
+cimport cython
+
+cdef Py_ssize_t CRS_LEN
+
+@cython.locals(num=object)
+cpdef str parse_value(str value)
+
+@cython.locals(key=str, value=str)
+cpdef list _crs_attrs(object attrib, frozenset skip=*)
+
+@cython.locals(clean_key=str, value=str)
+cpdef str _format_attrs(object attrib, str fmt, frozenset skip=*)
+
+cpdef parse_gesture(object gesture_elem, object out)
+
+@cython.locals(clean_key=str, value=str)
+cpdef parse_correction_masks(object masks_elem, object out)
+
+@cython.locals(clean_key=str, value=str)
+cpdef parse_mask_group(object mask_group, object out)
+
+@cython.locals(clean_key=str, value=str)
+cpdef parse_look_parameters(object params, object out)
+
+@cython.locals(clean_key=str, value=str)
+cpdef parse_look(object look_elem, object out)
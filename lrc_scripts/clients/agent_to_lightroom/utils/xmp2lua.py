@@ -1,4 +1,45 @@
-import xml.etree.ElementTree as ET
+import io
+import os
+import re
+import sys
+
+try:
+    from lxml import etree as ET
+    _XMLParser = _TreeBuilder = None
+except ImportError:
+    import xml.etree.ElementTree as ET
+    # Pin the stdlib fallback to the C accelerator; builds without it (e.g. PyPy) should install lxml
+    try:
+        from _elementtree import XMLParser as _XMLParser, TreeBuilder as _TreeBuilder
+    except ImportError:
+        _XMLParser, _TreeBuilder = ET.XMLParser, ET.TreeBuilder
+
+# Clark-notation prefix of camera-raw-settings attributes; slicing by its length yields the local name
+CRS_NS = '{http://ns.adobe.com/camera-raw-settings/1.0/}'
+CRS_LEN = len(CRS_NS)
+RDF_NS = '{http://www.w3.org/1999/02/22-rdf-syntax-ns#}'
+_XML_LANG = '{http://www.w3.org/XML/1998/namespace}lang'
+
+# Fully-qualified tag names, so lookups skip prefix expansion and XPath parsing
+_RDF_LI = RDF_NS + 'li'
+_RDF_SEQ = RDF_NS + 'Seq'
+_RDF_ALT = RDF_NS + 'Alt'
+_RDF_DESC = RDF_NS + 'Description'
+_CRS_POINTS = CRS_NS + 'Points'
+_CRS_MASKS = CRS_NS + 'Masks'
+_CRS_DABS = CRS_NS + 'Dabs'
+_CRS_RANGE = CRS_NS + 'CorrectionRangeMask'
+_CRS_POINT_MODELS = CRS_NS + 'PointModels'
+_CRS_GESTURE = CRS_NS + 'Gesture'
+_CRS_LOCAL_POINT_COLORS = CRS_NS + 'LocalPointColors'
+_CRS_CORRECTION_MASKS = CRS_NS + 'CorrectionMasks'
+_CRS_GROUP = CRS_NS + 'Group'
+_CRS_PARAMETERS = CRS_NS + 'Parameters'
+_SEQ_LI = f'{_RDF_SEQ}/{_RDF_LI}'
+_LI_DESC = f'{_RDF_LI}/{_RDF_DESC}'
+_TONE_CURVES = tuple((name, CRS_NS + name) for name in
+                     ['ToneCurvePV2012', 'ToneCurvePV2012Red', 'ToneCurvePV2012Green', 'ToneCurvePV2012Blue'])
+_LOCAL_CURVES = tuple((name, CRS_NS + name) for name in ['MainCurve', 'RedCurve', 'GreenCurve', 'BlueCurve'])
 
 version_strings = ['Version', 'ProcessVersion']
 crop_strings = ['CropTop', 'CropLeft', 'CropBottom', 'CropRight', 'CropAngle', 'CropConstrainToWarp', 'HasCrop']
@@ -8,56 +49,172 @@ exclude_keys = ['Version',
                 'ToneCurvePV2012Green', 'ToneCurvePV2012Blue',
                 'CorrectionSyncID','MaskSyncID']
 
+# Set views of the key lists for O(1) membership tests in the attribute loops
+version_strings_set = frozenset(version_strings)
+crop_strings_set = frozenset(crop_strings)
+exclude_keys_set = frozenset(exclude_keys)
+# exclude_keys as qualified attribute names, so the filter runs before the prefix is sliced off
+_EXCLUDED_CRS_KEYS = frozenset(CRS_NS + key for key in exclude_keys)
+
+# parse_value dispatch: up to 15 digits an integer round-trips through float unchanged
+_INT_RE = re.compile(r'-?[0-9]{1,15}\Z')
+# Any character outside float()'s alphabet (digits, whitespace, sign, dot, underscore, exponent, inf/nan)
+_NON_NUMERIC_RE = re.compile(r'[^\s\d.+\-_eEiInNfFtTyYaA]')
+
+# Attribute line templates for the mask loops, keyed by indent width
+_ATTR_FMT_4 = "    %s = %s,\n"
+_ATTR_FMT_8 = "        %s = %s,\n"
+_ATTR_FMT_10 = "          %s = %s,\n"
+_ATTR_FMT_12 = "            %s = %s,\n"
+_ATTR_FMT_14 = "              %s = %s,\n"
+
+# Shared indent strings, indexed by width
+_INDENTS = tuple(' ' * width for width in range(33))
+
+def _crs_attrs(attrib, skip=frozenset()):
+    """(local name, value) pairs of the camera-raw-settings entries of an attrib mapping, minus the qualified keys in skip"""
+    # Interned names are shared across elements and hit the key-set lookups by identity
+    return [(sys.intern(key[CRS_LEN:]), value) for key, value in attrib.items()
+            if key.startswith(CRS_NS) and key not in skip]
+
+def _format_attrs(attrib, fmt, skip=frozenset()):
+    """The crs entries of an attrib mapping as one block of fmt lines, in document order"""
+    return "".join([fmt % (clean_key, _VALUE_EMITTERS.get(clean_key, parse_value)(value)) for clean_key, value in _crs_attrs(attrib, skip)])
+
+def _seq_descriptions(elem):
+    """Same elements as elem.findall('rdf:Seq/rdf:li/rdf:Description'), via direct child loops"""
+    return [desc for seq in elem if seq.tag == _RDF_SEQ
+            for item in seq if item.tag == _RDF_LI
+            for desc in item if desc.tag == _RDF_DESC]
+
+def _find_path(elem, *tags):
+    """Same result as elem.find('a/b/...') for plain tag steps, using direct child lookups"""
+    first, rest = tags[0], tags[1:]
+    if not rest:
+        return elem.find(first)
+    for child in elem.findall(first):
+        found = _find_path(child, *rest)
+        if found is not None:
+            return found
+    return None
+
 def parse_value(value):
     """Convert XMP value to Lua format"""
     if value.startswith('+'):
         value = value[1:]
-        
+    
+    # Plain integers are the common case and need neither float() nor exception handling
+    if _INT_RE.match(value):
+        return str(int(value))
+    # Only attempt float() when the value could be numeric at all
+    if not _NON_NUMERIC_RE.search(value):
+        try:
+            num = float(value)
+            if num.is_integer():
+                return str(int(num))
+            return str(num)
+        except ValueError:
+            pass
+    # Handle boolean values
+    if value.lower() == 'true':
+        return 'true'
+    if value.lower() == 'false':
+        return 'false'
+    # Return string values with quotes
+    return f'"{value}"'
+
+# Typed emitters for attributes whose Camera Raw type is known. Each one only takes
+# values of its own shape and hands anything else to parse_value, so the output is identical
+_LUA_BOOLS = {'True': 'true', 'False': 'false', 'true': 'true', 'false': 'false'}
+
+def _emit_bool(value):
+    return _LUA_BOOLS.get(value) or parse_value(value)
+
+def _emit_int(value):
+    digits = value[1:] if value.startswith('+') else value
+    if _INT_RE.match(digits):
+        return str(int(digits))
+    return parse_value(value)
+
+def _emit_float(value):
+    # float() takes the leading '+' itself
     try:
         num = float(value)
-        if num.is_integer():
-            return str(int(num))
-        return str(num)
     except ValueError:
-        # Handle boolean values
-        if value.lower() == 'true':
-            return 'true'
-        if value.lower() == 'false':
-            return 'false'
-        # Return string values with quotes
-        return f'"{value}"'
-
-def parse_tone_curve(seq_elem):
-    """Parse global tone curve sequence elements into Lua table format"""
-    result = []
-    points = []
-    for item in seq_elem.findall('rdf:li', namespaces={'rdf': "http://www.w3.org/1999/02/22-rdf-syntax-ns#"}):
-        if item.text:
-            x, y = map(str.strip, item.text.split(','))
-            points.append((x, y))
-    
-    # Format points as Lua table entries
+        return parse_value(value)
+    if num.is_integer():
+        return str(int(num))
+    return str(num)
+
+_ATTR_TYPES = {
+    **dict.fromkeys([
+        'HasSettings', 'HasCrop', 'AlreadyApplied', 'AutoLateralCA', 'AutoWhiteVersion',
+        'ConvertToGrayscale', 'Invert', 'MaskInverted', 'CorrectionActive', 'EnableCalibration',
+        'EnableColorAdjustments', 'EnableDetail', 'EnableEffects', 'EnableGrayscaleMix',
+        'EnableLensCorrections', 'EnableRedEye', 'EnableRetouch', 'EnableSplitToning',
+        'EnableToneCurve', 'EnableTransform', 'OverrideLookVignette', 'UprightFourSegmentsCount',
+    ], bool),
+    **dict.fromkeys([
+        'Temperature', 'Tint', 'IncrementalTemperature', 'IncrementalTint', 'Contrast2012',
+        'Highlights2012', 'Shadows2012', 'Whites2012', 'Blacks2012', 'Texture', 'Clarity2012',
+        'Dehaze', 'Vibrance', 'Saturation', 'ParametricShadows', 'ParametricDarks',
+        'ParametricLights', 'ParametricHighlights', 'ParametricShadowSplit',
+        'ParametricMidtoneSplit', 'ParametricHighlightSplit', 'Sharpness', 'SharpenDetail',
+        'SharpenEdgeMasking', 'LuminanceSmoothing', 'LuminanceNoiseReductionDetail',
+        'LuminanceNoiseReductionContrast', 'ColorNoiseReduction', 'ColorNoiseReductionDetail',
+        'ColorNoiseReductionSmoothness', 'SplitToningShadowHue', 'SplitToningShadowSaturation',
+        'SplitToningHighlightHue', 'SplitToningHighlightSaturation', 'SplitToningBalance',
+        'ColorGradeMidtoneHue', 'ColorGradeMidtoneSat', 'ColorGradeShadowLum',
+        'ColorGradeMidtoneLum', 'ColorGradeHighlightLum', 'ColorGradeBlending',
+        'ColorGradeGlobalHue', 'ColorGradeGlobalSat', 'ColorGradeGlobalLum',
+        'PostCropVignetteAmount', 'PostCropVignetteMidpoint', 'PostCropVignetteFeather',
+        'PostCropVignetteRoundness', 'PostCropVignetteStyle', 'PostCropVignetteHighlightContrast',
+        'GrainAmount', 'GrainSize', 'GrainFrequency', 'ShadowTint', 'RedHue', 'RedSaturation',
+        'GreenHue', 'GreenSaturation', 'BlueHue', 'BlueSaturation', 'DefringePurpleAmount',
+        'DefringePurpleHueLo', 'DefringePurpleHueHi', 'DefringeGreenAmount',
+        'DefringeGreenHueLo', 'DefringeGreenHueHi', 'VignetteAmount', 'VignetteMidpoint',
+        'LensProfileEnable', 'LensManualDistortionAmount', 'PerspectiveVertical',
+        'PerspectiveHorizontal', 'PerspectiveRotate', 'PerspectiveAspect', 'PerspectiveUpright',
+        'CorrectionAmount', 'Type', 'SampleType',
+    ] + [f'{kind}Adjustment{color}'
+         for kind in ('Hue', 'Saturation', 'Luminance')
+         for color in ('Red', 'Orange', 'Yellow', 'Green', 'Aqua', 'Blue', 'Purple', 'Magenta')]
+      + [f'GrayMixer{color}'
+         for color in ('Red', 'Orange', 'Yellow', 'Green', 'Aqua', 'Blue', 'Purple', 'Magenta')], int),
+    **dict.fromkeys([
+        'Exposure2012', 'LocalExposure2012', 'LocalContrast2012', 'LocalHighlights2012',
+        'LocalShadows2012', 'LocalWhites2012', 'LocalBlacks2012', 'LocalClarity2012',
+        'LocalTexture', 'LocalDehaze', 'LocalSaturation', 'LocalTemperature', 'LocalTint',
+        'LocalSharpness', 'LocalLuminanceNoise', 'LocalMoire', 'LocalDefringe', 'LocalHue',
+        'LocalGrain', 'LocalToningHue', 'LocalToningSaturation', 'LocalExposure',
+        'LocalContrast', 'LocalClarity', 'LocalBrightness', 'MaskValue', 'Feather', 'Flow',
+        'Density', 'Radius', 'Midpoint', 'Roundness', 'Angle', 'Top', 'Left', 'Bottom', 'Right',
+        'ZeroX', 'ZeroY', 'FullX', 'FullY', 'X', 'Y', 'Amount', 'CropAngle',
+    ], float),
+}
+_EMIT_BY_TYPE = {bool: _emit_bool, int: _emit_int, float: _emit_float}
+_VALUE_EMITTERS = {key: _EMIT_BY_TYPE[kind] for key, kind in _ATTR_TYPES.items()}
+
+def parse_tone_curve(seq_elem, out, indent):
+    """Write global tone curve sequence elements as Lua table entries"""
+    # Points are copied as text, so one template per x/y pair and a single write suffice
+    pair_fmt = f"{indent}[%d] = %s,\n{indent}[%d] = %s,\n"
+    lines = []
     i = 1
-    for x, y in points:
-        result.append(f"[{i}] = {x}")
-        result.append(f"[{i+1}] = {y}")
-        i += 2
-    
-    return result
+    for item in seq_elem.findall(_RDF_LI):
+        if item.text:
+            x, y = item.text.split(',')
+            lines.append(pair_fmt % (i, x.strip(), i + 1, y.strip()))
+            i += 2
+    out.write("".join(lines))
 
-def parse_local_tone_curve(seq_elem):
-    """Parse local adjustment tone curve sequence elements into Lua table format"""
-    result = []
-    points = []
-    for item in seq_elem.findall('rdf:li', namespaces={'rdf': "http://www.w3.org/1999/02/22-rdf-syntax-ns#"}):
+def parse_local_tone_curve(seq_elem, out, indent):
+    """Write local adjustment tone curve sequence elements as Lua table entries"""
+    i = 1
+    for item in seq_elem.findall(_RDF_LI):
         if item.text:
-            points.append(f'"{item.text}"')
-    
-    # Format points as Lua table entries
-    for i, point in enumerate(points, 1):
-        result.append(f"[{i}] = {point}")
-    
-    return result
+            out.write(f'{indent}[{i}] = "{item.text}",\n')
+            i += 1
 
 def print_element_tree(element, level=0):
     """Debug helper to print XML structure"""
@@ -72,419 +229,453 @@ def parse_reference_point(value):
         return f"{{{x}, {y}}}"
     return "{}"
 
-def parse_mask_dabs(dabs_elem, ns):
-    """Parse mask dabs sequence into Lua table format"""
-    result = []
-    result.append("            Dabs = {")
-    for dab in dabs_elem.findall('rdf:li', ns):
+def parse_mask_dabs(dabs_elem, out):
+    """Write mask dabs sequence as a Lua table"""
+    out.write("            Dabs = {\n")
+    for dab in dabs_elem.findall(_RDF_LI):
         if dab.text:
-            result.append(f'              "{dab.text}",')
-    result.append("            },")
-    return result
-
-def parse_point_models(points_elem, ns):
-    """Parse point models sequence into Lua table format"""
-    result = []
-    result.append("          PointModels = {")
-    for point in points_elem.findall('rdf:li', ns):
+            out.write(f'              "{dab.text}",\n')
+    out.write("            },\n")
+
+def parse_point_models(points_elem, out):
+    """Write point models sequence as a Lua table"""
+    out.write("          PointModels = {\n")
+    for point in points_elem.findall(_RDF_LI):
         if point.text:
             values = point.text
-            result.append(f'            "{values}",')
-    result.append("          },")
-    return result
-
-def parse_gesture(gesture_elem, ns):
-    """Parse gesture element into Lua table format"""
-    result = []
-    result.append("        Gesture = {")
+            out.write(f'            "{values}",\n')
+    out.write("          },\n")
+
+def parse_gesture(gesture_elem, out):
+    """Write gesture element as a Lua table"""
+    out.write("        Gesture = {\n")
     
     # Handle each gesture item
-    for gesture_item in gesture_elem.findall('rdf:Seq/rdf:li/rdf:Description', ns):
-        result.append("          {")
+    for gesture_item in _seq_descriptions(gesture_elem):
+        out.write("          {\n")
         
         # Process gesture attributes
-        for key, value in gesture_item.attrib.items():
-            if key.startswith('{http://ns.adobe.com/camera-raw-settings/1.0/}'):
-                clean_key = key.split('}')[1]
-                if clean_key not in exclude_keys:
-                    result.append(f"            {clean_key} = {parse_value(value)},")
+        out.write(_format_attrs(gesture_item.attrib, _ATTR_FMT_12, _EXCLUDED_CRS_KEYS))
         
         # Handle Points if they exist
-        dabs_elem = gesture_item.find('crs:Points/rdf:Seq', ns)
+        dabs_elem = _find_path(gesture_item, _CRS_POINTS, _RDF_SEQ)
         if dabs_elem is not None:
-            result.append("            Points = {")
-            for dab in dabs_elem.findall('rdf:li', ns):
-                result.append("            {")
-                for key, value in dab.attrib.items():
-                    if key.startswith('{http://ns.adobe.com/camera-raw-settings/1.0/}'):
-                        clean_key = key.split('}')[1]
-                        result.append(f"              {clean_key} = {parse_value(value)},")
-                result.append("            },")
-            result.append("            },")
-        result.append("          },")
+            out.write("            Points = {\n")
+            for dab in dabs_elem.findall(_RDF_LI):
+                out.write("            {\n")
+                out.write(_format_attrs(dab.attrib, _ATTR_FMT_14))
+                out.write("            },\n")
+            out.write("            },\n")
+        out.write("          },\n")
     
-    result.append("        },")
-    return result
+    out.write("        },\n")
+
+# CorrectionRangeMask attributes with a fixed Lua type; anything else goes through parse_value
+def _emit_range_number(key, value):
+    return _ATTR_FMT_10 % (key, value)
+
+def _emit_range_bool(key, value):
+    return _ATTR_FMT_10 % (key, value.lower())
+
+def _emit_range_string(key, value):
+    return '          %s = "%s",\n' % (key, value)
+
+def _emit_range_value(key, value):
+    return _ATTR_FMT_10 % (key, parse_value(value))
 
-def parse_correction_masks(masks_elem, ns):
-    """Parse correction masks into Lua table format"""
-    result = []
-    result.append("    CorrectionMasks = {")
+_RANGE_NUMBER_KEYS = frozenset(["Type", "Version", "SampleType"])
+_RANGE_BOOL_KEYS = frozenset(["Invert"])
+_RANGE_STRING_KEYS = frozenset(["LumRange", "LuminanceDepthSampleInfo"])
+_RANGE_MASK_EMITTERS = {
+    **dict.fromkeys(_RANGE_NUMBER_KEYS, _emit_range_number),
+    **dict.fromkeys(_RANGE_BOOL_KEYS, _emit_range_bool),
+    **dict.fromkeys(_RANGE_STRING_KEYS, _emit_range_string),
+}
+
+def parse_correction_masks(masks_elem, out):
+    """Write correction masks as a Lua table"""
+    out.write("    CorrectionMasks = {\n")
     
     # Handle both types of mask structures
-    for mask_item in masks_elem.findall('rdf:li', ns):
-        if len(mask_item.attrib) > 0:  # Direct attributes on rdf:li
-            result.append("      {")
-            for key, value in mask_item.attrib.items():
-                if key.startswith('{http://ns.adobe.com/camera-raw-settings/1.0/}'):
-                    clean_key = key.split('}')[1]
-                    if clean_key not in exclude_keys:
-                        result.append(f"        {clean_key} = {parse_value(value)},")
-            result.append("      },")
+    for mask_item in masks_elem.findall(_RDF_LI):
+        attrib = mask_item.attrib
+        if len(attrib) > 0:  # Direct attributes on rdf:li
+            out.write("      {\n%s      },\n" % _format_attrs(attrib, _ATTR_FMT_8, _EXCLUDED_CRS_KEYS))
         else:  # Complex mask structure with nested Description
-            for mask in mask_item.findall('rdf:Description', ns):
-                result.append("      {")
+            for mask in mask_item.findall(_RDF_DESC):
+                out.write("      {\n")
                 # Process mask attributes
-                for key, value in mask.attrib.items():
-                    if key.startswith('{http://ns.adobe.com/camera-raw-settings/1.0/}'):
-                        clean_key = key.split('}')[1]
-                        if clean_key not in exclude_keys:
-                            result.append(f"        {clean_key} = {parse_value(value)},")
+                out.write(_format_attrs(mask.attrib, _ATTR_FMT_8, _EXCLUDED_CRS_KEYS))
+                
+                # One pass over the children picks up the first of each sub-element
+                nested_masks = range_mask = gesture_elem = None
+                for child in mask:
+                    tag = child.tag
+                    if tag == _CRS_MASKS:
+                        if nested_masks is None:
+                            nested_masks = child.find(_RDF_SEQ)
+                    elif tag == _CRS_RANGE:
+                        if range_mask is None:
+                            range_mask = child
+                    elif tag == _CRS_GESTURE:
+                        if gesture_elem is None:
+                            gesture_elem = child
                 
                 # Handle nested Masks
-                nested_masks = mask.find('crs:Masks/rdf:Seq', ns)
                 if nested_masks is not None:
-                    result.append("        Masks = {")
-                    for nested_mask in nested_masks.findall('rdf:li/rdf:Description', ns):
-                        result.append("          {")
-                        for key, value in nested_mask.attrib.items():
-                            if key.startswith('{http://ns.adobe.com/camera-raw-settings/1.0/}'):
-                                clean_key = key.split('}')[1]
-                                if clean_key not in exclude_keys:
-                                    result.append(f"            {clean_key} = {parse_value(value)},")
+                    out.write("        Masks = {\n")
+                    for nested_mask in nested_masks.findall(_LI_DESC):
+                        out.write("          {\n")
+                        out.write(_format_attrs(nested_mask.attrib, _ATTR_FMT_12, _EXCLUDED_CRS_KEYS))
                         
                         # Handle Dabs
-                        dabs_elem = nested_mask.find('crs:Dabs/rdf:Seq', ns)
+                        dabs_elem = _find_path(nested_mask, _CRS_DABS, _RDF_SEQ)
                         if dabs_elem is not None:
-                            result.extend(parse_mask_dabs(dabs_elem, ns))
-                        result.append("          },")
-                    result.append("        },")
+                            parse_mask_dabs(dabs_elem, out)
+                        out.write("          },\n")
+                    out.write("        },\n")
                 
                 # Handle CorrectionRangeMask(light range)
-                range_mask = mask.find('crs:CorrectionRangeMask', ns)
                 if range_mask is not None:
-                    result.append("        CorrectionRangeMask = {")
-                    for key, value in range_mask.attrib.items():
-                        if key.startswith('{http://ns.adobe.com/camera-raw-settings/1.0/}'):
-                            clean_key = key.split('}')[1]
-                            if clean_key in ["Type", "Version", "SampleType"]:
-                                # Handle number type values
-                                result.append(f'          {clean_key} = {value},')
-                            elif clean_key == "Invert":
-                                # Handle boolean type values
-                                result.append(f'          {clean_key} = {value.lower()},')
-                            elif clean_key == "LumRange" or clean_key == "LuminanceDepthSampleInfo":
-                                # Handle string type values
-                                result.append(f'          {clean_key} = "{value}",')
-                            else:
-                                result.append(f'          {clean_key} = {parse_value(value)},')
+                    out.write("        CorrectionRangeMask = {\n")
+                    for clean_key, value in _crs_attrs(range_mask.attrib):
+                        out.write(_RANGE_MASK_EMITTERS.get(clean_key, _emit_range_value)(clean_key, value))
                     
                     # Handle PointModels (color range)
-                    description = range_mask.find('rdf:Description', ns)
+                    description = points_elem = None
+                    for child in range_mask:
+                        if child.tag == _RDF_DESC:
+                            if description is None:
+                                description = child
+                            if points_elem is None:
+                                points_elem = _find_path(child, _CRS_POINT_MODELS, _RDF_SEQ)
                     if description is not None:
-                        for key, value in description.attrib.items():
-                            if key.startswith('{http://ns.adobe.com/camera-raw-settings/1.0/}'):
-                                clean_key = key.split('}')[1]
-                                result.append(f'          {clean_key} = {parse_value(value)},')
-                    points_elem = range_mask.find('rdf:Description/crs:PointModels/rdf:Seq', ns)
+                        out.write(_format_attrs(description.attrib, _ATTR_FMT_10))
                     if points_elem is not None:
-                        result.extend(parse_point_models(points_elem, ns))
-                    result.append("        },")
+                        parse_point_models(points_elem, out)
+                    out.write("        },\n")
 
                 # Handle Gesture
-                gesture_elem = mask.find('crs:Gesture', ns)
                 if gesture_elem is not None:
-                    result.extend(parse_gesture(gesture_elem, ns))
+                    parse_gesture(gesture_elem, out)
 
-                result.append("      },")
+                out.write("      },\n")
     
-    result.append("    },")
-    return result
-
-def parse_single_tag_attributes(elem, tag_name, ns, indent=2):
-    """Parse single tag with attributes into Lua table format"""
-    result = []
-    spaces = " " * indent
-    result.append(f"{spaces}{tag_name} = {{")
+    out.write("    },\n")
+
+def parse_single_tag_attributes(elem, tag_name, out, indent=2):
+    """Write single tag with attributes as a Lua table"""
+    spaces = _INDENTS[indent]
+    out.write(f"{spaces}{tag_name} = {{\n")
     
-    for key, value in elem.attrib.items():
-        if key.startswith('{http://ns.adobe.com/camera-raw-settings/1.0/}'):
-            clean_key = key.split('}')[1]
-            if clean_key == "FocalRange":
-                value = "0 0 100 100"
-            result.append(f"{spaces}  {clean_key} = {parse_value(value)},")
+    for clean_key, value in _crs_attrs(elem.attrib):
+        if clean_key == "FocalRange":
+            value = "0 0 100 100"
+        out.write(f"{spaces}  {clean_key} = {parse_value(value)},\n")
     
-    result.append(f"{spaces}}},")
-    return result
+    out.write(f"{spaces}}},\n")
 
-def parse_mask_group(mask_group, ns):
-    """Parse mask group corrections into Lua table format"""
-    result = []
-    result.append("{")
+def parse_mask_group(mask_group, out):
+    """Write mask group corrections as a Lua table"""
+    out.write("{\n")
     
-    corrections = mask_group.findall('rdf:Seq/rdf:li/rdf:Description', ns)
+    corrections = _seq_descriptions(mask_group)
     
     for i, correction in enumerate(corrections, 1):
-        result.append(f"  {{")
+        out.write(f"  {{\n")
         
         # Process correction attributes
-        for key, value in correction.attrib.items():
-            if key.startswith('{http://ns.adobe.com/camera-raw-settings/1.0/}'):
-                clean_key = key.split('}')[1]
-                if clean_key not in exclude_keys:
-                    if clean_key in version_strings:
-                        result.append(f"    {clean_key} = \"{value}\",")
-                    else:
-                        result.append(f"    {clean_key} = {parse_value(value)},")
+        for clean_key, value in _crs_attrs(correction.attrib, _EXCLUDED_CRS_KEYS):
+            if clean_key in version_strings_set:
+                out.write(f"    {clean_key} = \"{value}\",\n")
+            else:
+                out.write(_ATTR_FMT_4 % (clean_key, _VALUE_EMITTERS.get(clean_key, parse_value)(value)))
         
         # Handle local adjustment curves
-        for curve in ['MainCurve', 'RedCurve', 'GreenCurve', 'BlueCurve']:
-            curve_elem = correction.find(f'crs:{curve}', ns)
+        for curve, curve_tag in _LOCAL_CURVES:
+            curve_elem = correction.find(curve_tag)
             if curve_elem is not None:
-                result.append(f"    {curve} = {{")
-                seq = curve_elem.find('rdf:Seq', ns)
+                out.write(f"    {curve} = {{\n")
+                seq = curve_elem.find(_RDF_SEQ)
                 if seq is not None:
-                    result.extend(f"      {line}," for line in parse_local_tone_curve(seq))
-                result.append("    },")
+                    parse_local_tone_curve(seq, out, "      ")
+                out.write("    },\n")
         
         # Handle LocalPointColors
-        local_point_colors = correction.find('crs:LocalPointColors/rdf:Seq', ns)
+        local_point_colors = _find_path(correction, _CRS_LOCAL_POINT_COLORS, _RDF_SEQ)
         if local_point_colors is not None:
-            result.append("    LocalPointColors = {")
-            for i, point in enumerate(local_point_colors.findall('rdf:li', ns), 1):
+            out.write("    LocalPointColors = {\n")
+            for i, point in enumerate(local_point_colors.findall(_RDF_LI), 1):
                 if point.text:
-                    result.append(f'      [{i}] = "{point.text}",')
-            result.append("    },")
+                    out.write(f'      [{i}] = "{point.text}",\n')
+            out.write("    },\n")
         
         # Handle CorrectionMasks
-        masks_elem = correction.find('crs:CorrectionMasks/rdf:Seq', ns)
+        masks_elem = _find_path(correction, _CRS_CORRECTION_MASKS, _RDF_SEQ)
         if masks_elem is not None:
-            result.extend(parse_correction_masks(masks_elem, ns))
-        result.append("  },")
-    result.append("}")
-    return result
-
-def parse_look_parameters(params, ns):
-    """Parse Look parameters into Lua table format"""
-    result = []
-    result.append("  Parameters = {")
+            parse_correction_masks(masks_elem, out)
+        out.write("  },\n")
+    out.write("}\n")
+
+def parse_look_parameters(params, out):
+    """Write Look parameters as a Lua table"""
+    out.write("  Parameters = {\n")
     
     # Handle basic parameters
-    for key, value in params.attrib.items():
-        if key.startswith('{http://ns.adobe.com/camera-raw-settings/1.0/}'):
-            clean_key = key.split('}')[1]
-            if clean_key in version_strings:
-                result.append(f"    {clean_key} = \"{value}\",")
-            else:
-                result.append(f"    {clean_key} = {parse_value(value)},")
+    for clean_key, value in _crs_attrs(params.attrib):
+        if clean_key in version_strings_set:
+            out.write(f"    {clean_key} = \"{value}\",\n")
+        else:
+            out.write(f"    {clean_key} = {parse_value(value)},\n")
     
     # Handle tone curves in parameters
-    for curve in ['ToneCurvePV2012', 'ToneCurvePV2012Red', 
-                  'ToneCurvePV2012Green', 'ToneCurvePV2012Blue']:
-        curve_elem = params.find(f'crs:{curve}', ns)
+    for curve, curve_tag in _TONE_CURVES:
+        curve_elem = params.find(curve_tag)
         if curve_elem is not None:
-            result.append(f"    {curve} = {{")
-            seq = curve_elem.find('rdf:Seq', ns)
+            out.write(f"    {curve} = {{\n")
+            seq = curve_elem.find(_RDF_SEQ)
             if seq is not None:
-                result.extend(f"      {line}," for line in parse_tone_curve(seq))
-            result.append("    },")
+                parse_tone_curve(seq, out, "      ")
+            out.write("    },\n")
     
-    result.append("  },")
-    return result
+    out.write("  },\n")
 
-def parse_alt_group(alt_elem, ns):
-    """Parse Alt group elements into Lua table format"""
-    result = []
-    result.append("{")
+def parse_alt_group(alt_elem, out, indent=""):
+    """Write Alt group elements as a Lua table"""
+    out.write(f"{indent}{{\n")
     
-    for li in alt_elem.findall('rdf:li', ns):
-        lang = li.get('{http://www.w3.org/XML/1998/namespace}lang')
+    entry_fmt = indent + '["%s"] = "%s",\n'
+    for li in alt_elem.findall(_RDF_LI):
+        lang = li.get(_XML_LANG)
         if lang and li.text:
-            result.append(f'["{lang}"] = "{li.text}",')
+            out.write(entry_fmt % (lang, li.text))
     
-    result.append("}")
-    return result
+    out.write(f"{indent}}}\n")
 
-def parse_look(look_elem, ns):
-    """Parse Look element into Lua table format"""
-    result = []
-    result.append("{")
+def parse_look(look_elem, out):
+    """Write Look element as a Lua table"""
+    out.write("{\n")
     
     # Check if this is a single tag with attributes
     if len(look_elem) == 0:
         # Handle single tag case
-        for key, value in look_elem.attrib.items():
-            if key.startswith('{http://ns.adobe.com/camera-raw-settings/1.0/}'):
-                clean_key = key.split('}')[1]
-                if clean_key in version_strings:
-                    result.append(f"  {clean_key} = \"{value}\",")
-                else:
-                    result.append(f"  {clean_key} = {parse_value(value)},")
+        for clean_key, value in _crs_attrs(look_elem.attrib):
+            if clean_key in version_strings_set:
+                out.write(f"  {clean_key} = \"{value}\",\n")
+            else:
+                out.write(f"  {clean_key} = {parse_value(value)},\n")
     else:
         # Handle complex nested structure
-        look_desc = look_elem.find('rdf:Description', ns)
+        look_desc = look_elem.find(_RDF_DESC)
         if look_desc is not None:
             # Handle basic attributes
-            for key, value in look_desc.attrib.items():
-                if key.startswith('{http://ns.adobe.com/camera-raw-settings/1.0/}'):
-                    clean_key = key.split('}')[1]
-                    if clean_key in version_strings:
-                        result.append(f"  {clean_key} = \"{value}\",")
-                    else:
-                        result.append(f"  {clean_key} = {parse_value(value)},")
+            for clean_key, value in _crs_attrs(look_desc.attrib):
+                if clean_key in version_strings_set:
+                    out.write(f"  {clean_key} = \"{value}\",\n")
+                else:
+                    out.write(f"  {clean_key} = {parse_value(value)},\n")
             
             # Handle Group element inside Look
-            group_elem = look_desc.find('crs:Group/rdf:Alt', ns)
+            group_elem = _find_path(look_desc, _CRS_GROUP, _RDF_ALT)
             if group_elem is not None:
-                result.append("  Group = ")
-                result.extend("  " + line for line in parse_alt_group(group_elem, ns))
-                result.append(",")
+                out.write("  Group = \n")
+                parse_alt_group(group_elem, out, "  ")
+                out.write(",\n")
             
             # Handle Parameters
-            params = look_desc.find('crs:Parameters', ns)
-            if params and len(params.attrib.items()) == 0:
-                params = look_desc.find('crs:Parameters/rdf:Description', ns)
+            params = look_desc.find(_CRS_PARAMETERS)
+            if params is not None and len(params) > 0 and len(params.attrib) == 0:
+                params = _find_path(look_desc, _CRS_PARAMETERS, _RDF_DESC)
             if params is not None:
-                result.extend(parse_look_parameters(params, ns))
+                parse_look_parameters(params, out)
     
-    result.append("}")
-    return result
+    out.write("}\n")
 
-def parse_point_colors(point_colors_elem, ns):
-    """Parse PointColors element into Lua table format"""
-    result = []
-    result.append("PointColors = {")
+# One PointColors entry: 19 comma-separated floats, formatted as str(float) would
+_POINT_COLOR_TEMPLATE = """\
+  {
+    SrcHue = %r,
+    SrcSat = %r,
+    SrcLum = %r,
+    HueShift = %r,
+    SatScale = %r,
+    LumScale = %r,
+    RangeAmount = %r,
+    HueRange = {
+      LowerNone = %r,
+      LowerFull = %r,
+      UpperFull = %r,
+      UpperNone = %r,
+    },
+    SatRange = {
+      LowerNone = %r,
+      LowerFull = %r,
+      UpperFull = %r,
+      UpperNone = %r,
+    },
+    LumRange = {
+      LowerNone = %r,
+      LowerFull = %r,
+      UpperFull = %r,
+      UpperNone = %r,
+    },
+  },
+"""
+
+def parse_point_colors(point_colors_elem, out):
+    """Write PointColors element as a Lua table"""
+    out.write("PointColors = {\n")
     
     # Find all point color entries
-    for point in point_colors_elem.findall('rdf:Seq/rdf:li', ns):
+    for point in point_colors_elem.findall(_SEQ_LI):
         if point.text:
-            # Split the values and remove any whitespace
-            values = [float(x.strip()) for x in point.text.split(',')]
-            
-            # Create a point color entry
-            result.append("  {")
-            result.append(f"    SrcHue = {values[0]},")
-            result.append(f"    SrcSat = {values[1]},")
-            result.append(f"    SrcLum = {values[2]},")
-            result.append(f"    HueShift = {values[3]},")
-            result.append(f"    SatScale = {values[4]},")
-            result.append(f"    LumScale = {values[5]},")
-            result.append(f"    RangeAmount = {values[6]},")
-            
-            # Add HueRange
-            result.append("    HueRange = {")
-            result.append(f"      LowerNone = {values[7]},")
-            result.append(f"      LowerFull = {values[8]},")
-            result.append(f"      UpperFull = {values[9]},")
-            result.append(f"      UpperNone = {values[10]},")
-            result.append("    },")
-            
-            # Add SatRange
-            result.append("    SatRange = {")
-            result.append(f"      LowerNone = {values[11]},")
-            result.append(f"      LowerFull = {values[12]},")
-            result.append(f"      UpperFull = {values[13]},")
-            result.append(f"      UpperNone = {values[14]},")
-            result.append("    },")
-            
-            # Add LumRange
-            result.append("    LumRange = {")
-            result.append(f"      LowerNone = {values[15]},")
-            result.append(f"      LowerFull = {values[16]},")
-            result.append(f"      UpperFull = {values[17]},")
-            result.append(f"      UpperNone = {values[18]},")
-            result.append("    },")
-            
-            result.append("  },")
+            # float() ignores surrounding whitespace itself
+            values = tuple(map(float, point.text.split(',')))
+            if len(values) < 19:
+                raise IndexError(f"PointColors entry has {len(values)} values, expected 19")
+            out.write(_POINT_COLOR_TEMPLATE % values[:19])
     
-    result.append("},")
-    return result
+    out.write("},\n")
+
+def _iterparse(xmp_file):
+    """Stream start/end events; the stdlib fallback is pinned to the C-accelerated parser"""
+    events = ('start', 'end')
+    if _XMLParser is None:
+        return ET.iterparse(xmp_file, events=events)
+    return ET.iterparse(xmp_file, events=events, parser=_XMLParser(target=_TreeBuilder()))
+
+def _render_section(name, elem, out):
+    """Write one child section of the main Description as Lua"""
+    if name in ('ToneCurvePV2012', 'ToneCurvePV2012Red', 
+                'ToneCurvePV2012Green', 'ToneCurvePV2012Blue'):
+        out.write(f"{name} = {{\n")
+        seq = elem.find(_RDF_SEQ)
+        if seq is not None:
+            parse_tone_curve(seq, out, "  ")
+        out.write("},\n")
+    elif name == 'MaskGroupBasedCorrections':
+        out.write("MaskGroupBasedCorrections = \n")
+        parse_mask_group(elem, out)
+        out.write(",\n")
+    elif name == 'Look':
+        out.write("Look = \n")
+        parse_look(elem, out)
+        out.write(",\n")
+    elif name in ('LensBlur', 'DepthMapInfo'):
+        parse_single_tag_attributes(elem, name, out)
+    elif name == 'PointColors':
+        parse_point_colors(elem, out)
+
+# Sections rendered after the basic attributes, in output order
+_SECTION_ORDER = ('ToneCurvePV2012', 'ToneCurvePV2012Red', 'ToneCurvePV2012Green', 'ToneCurvePV2012Blue',
+                  'MaskGroupBasedCorrections', 'Look', 'LensBlur', 'DepthMapInfo', 'PointColors')
+_SECTION_TAGS = {CRS_NS + name: name for name in _SECTION_ORDER}
 
 def parse_xmp(xmp_file):
     """Parse XMP file and convert to Lua table format"""
-    tree = ET.parse(xmp_file)
-    root = tree.getroot()
-    
-    ns = {
-        'crs': "http://ns.adobe.com/camera-raw-settings/1.0/",
-        'rdf': "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
-    }
+    # Single streaming pass: the first rdf:Description holds the settings; each of its
+    # child sections is rendered as soon as it closes and then freed. Anything after
+    # that Description closes (e.g. a second rdf:Description) is ignored.
+    desc = None
+    desc_open = False
+    desc_depth = None
+    depth = 0
+    sections = {}
+    for event, elem in _iterparse(xmp_file):
+        if event == 'start':
+            depth += 1
+            if desc is None and elem.tag == _RDF_DESC:
+                desc = elem
+                desc_open = True
+                desc_depth = depth
+            continue
+        
+        if desc_open:
+            if elem is desc:
+                desc_open = False
+            elif depth == desc_depth + 1:
+                name = _SECTION_TAGS.get(elem.tag)
+                # Only the first occurrence of each section is used
+                if name is not None and name not in sections:
+                    section = io.StringIO()
+                    _render_section(name, elem, section)
+                    sections[name] = section.getvalue()
+                elem.clear()
+                desc.remove(elem)
+        depth -= 1
     
-    result = []
-    result.append("{")  # Start of main table
-    desc = root.find('.//rdf:Description', ns)
+    out = io.StringIO()
+    out.write("{\n")  # Start of main table
     
     # Process basic attributes
-    for key, value in desc.attrib.items():
-        if key.startswith('{http://ns.adobe.com/camera-raw-settings/1.0/}'):
-            clean_key = key.split('}')[1]
-            if clean_key not in exclude_keys:
-                if "table_" in clean_key.lower() or clean_key in crop_strings: 
-                    continue
-                if clean_key in version_strings:
-                    result.append(f"{clean_key} = \"{value}\",")
-                else:
-                    result.append(f"{clean_key} = {parse_value(value)},")
+    for clean_key, value in _crs_attrs(desc.attrib, _EXCLUDED_CRS_KEYS):
+        if "table_" in clean_key.lower() or clean_key in crop_strings_set: 
+            continue
+        if clean_key in version_strings_set:
+            out.write(f"{clean_key} = \"{value}\",\n")
+        else:
+            out.write(f"{clean_key} = {_VALUE_EMITTERS.get(clean_key, parse_value)(value)},\n")
     
+    # Tone curves, mask groups, Look, LensBlur, DepthMapInfo and PointColors
+    for name in _SECTION_ORDER:
+        if name in sections:
+            out.write(sections[name])
     
-    # Handle tone curves
-    for curve in ['ToneCurvePV2012', 'ToneCurvePV2012Red', 
-                  'ToneCurvePV2012Green', 'ToneCurvePV2012Blue']:
-        curve_elem = desc.find(f'crs:{curve}', ns)
-        if curve_elem is not None:
-            result.append(f"{curve} = {{")
-            seq = curve_elem.find('rdf:Seq', ns)
-            if seq is not None:
-                result.extend(f"  {line}," for line in parse_tone_curve(seq))
-            result.append("},")
+    out.write("}")  # End of main table
+    return out.getvalue()
+
+def convert_file(xmp_file, output_file):
+    """Convert one XMP preset and save it as a Lua table"""
+    lua_table = parse_xmp(xmp_file)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write('return ' + lua_table)
+    return output_file
+
+def _convert_one(paths):
+    """Picklable wrapper around convert_file for process pools"""
+    xmp_file, output_file = paths
+    return convert_file(xmp_file, output_file)
+
+def convert_batch(xmp_files, output_dir=None, max_workers=None):
+    """Convert several XMP presets in parallel, one process per core"""
+    from concurrent.futures import ProcessPoolExecutor
     
-    # Handle mask groups
-    mask_group = desc.find('crs:MaskGroupBasedCorrections', ns)
-    if mask_group is not None:
-        result.append("MaskGroupBasedCorrections = ")
-        result.extend(parse_mask_group(mask_group, ns))
-        result.append(",")
+    pairs = []
+    for xmp_file in xmp_files:
+        base_name = os.path.splitext(os.path.basename(xmp_file))[0]
+        target_dir = output_dir or os.path.dirname(xmp_file)
+        pairs.append((xmp_file, os.path.join(target_dir, f"{base_name}.lua")))
+    
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_convert_one, pairs, chunksize=8))
+
+def main():
+    import glob
     
-    # Handle Look data
-    look_elem = desc.find('crs:Look', ns)
-    if look_elem is not None:
-        result.append("Look = ")
-        result.extend(parse_look(look_elem, ns))
-        result.append(",")
+    # No arguments: convert config.xmp in the working directory
+    if len(sys.argv) < 2:
+        convert_file('config.xmp', 'converted_settings.lua')
+        return
     
-    # Handle LensBlur
-    lens_blur = desc.find('crs:LensBlur', ns)
-    if lens_blur is not None:
-        result.extend(parse_single_tag_attributes(lens_blur, "LensBlur", ns))
-
-    # Handle DepthMapInfo
-    depth_map = desc.find('crs:DepthMapInfo', ns)
-    if depth_map is not None:
-        result.extend(parse_single_tag_attributes(depth_map, "DepthMapInfo", ns))
+    input_path = sys.argv[1]
+    output_path = sys.argv[2] if len(sys.argv) > 2 else None
     
-    # Handle PointColors
-    point_colors = desc.find('crs:PointColors', ns)
-    if point_colors is not None:
-        result.extend(parse_point_colors(point_colors, ns))
+    # A directory or glob pattern converts every matching XMP file in parallel
+    if os.path.isdir(input_path) or glob.has_magic(input_path):
+        pattern = os.path.join(input_path, "*.xmp") if os.path.isdir(input_path) else input_path
+        xmp_files = sorted(glob.glob(pattern))
+        if not xmp_files:
+            print(f"No XMP files found for: {input_path}")
+            sys.exit(1)
+        output_files = convert_batch(xmp_files, output_path)
+        print(f"Converted {len(output_files)} presets.")
+        return
     
-    result.append("}")  # End of main table
-    return '\n'.join(result)
-
-def main():
-    # Parse XMP and save as Lua table
-    lua_table = parse_xmp('config.xmp')
-    with open('converted_settings.lua', 'w', encoding='utf-8') as f:
-        f.write('return ' + lua_table)
+    if not output_path:
+        output_path = os.path.splitext(input_path)[0] + '.lua'
+    convert_file(input_path, output_path)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
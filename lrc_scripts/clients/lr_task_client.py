@@ -7,20 +7,303 @@ Adapted to message center state machine: pending -> reading -> processing -> com
 
 import asyncio
 import aiohttp
+import hashlib
 import json
 import argparse
 import time
 import logging
+import mmap
 import os
-import requests
+import random
+import re
+import select
+from collections import deque
+from itertools import accumulate, cycle
 from typing import Dict, Any, Optional
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Optional: wait for Lightroom output files via kernel file events (Linux: inotify, macOS: FSEvents)
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:
+    INotify = None
+try:
+    from fsevents import Observer as FSEventsObserver, Stream as FSEventsStream
+except ImportError:
+    FSEventsObserver = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
+# Downloads are written to disk in buffers of this size (bytes)
+DOWNLOAD_WRITE_SIZE = 1 << 20
+
+# Lua configuration tokens that set the processing timeout, found in a single regex pass
+_MASK_GROUP_TOKEN = b'MaskGroupBasedCorrections'
+_MASK_TOKEN = b'What = "Mask/Image"'  # One per actual mask in CorrectionMasks
+_COMPLEX_OPERATIONS = frozenset((
+    b'LocalizedCorrections',  # Local adjustments
+    b'CircularGradientBasedCorrections',  # Radial filter
+    b'GradientBasedCorrections',  # Gradient filter
+    b'RetouchAreas',  # Spot removal
+))
+# Configs at least this large are memory-mapped for the scan instead of read into memory
+_MMAP_SCAN_MIN_SIZE = 1 << 20
+_COMPLEXITY_TOKEN_RE = re.compile(b'|'.join(
+    re.escape(token) for token in (_MASK_GROUP_TOKEN, _MASK_TOKEN, *sorted(_COMPLEX_OPERATIONS, key=len, reverse=True))
+))
+
+
+def json_dumps(obj) -> str:
+    """Serialize request payloads, using orjson when it is installed"""
+    return orjson.dumps(obj).decode() if orjson else json.dumps(obj)
+
+
+def json_loads(data):
+    """Parse response bodies (bytes), using orjson when it is installed"""
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+def jittered(delay: float) -> float:
+    """Spread a delay by ±20% so clients started together don't poll in lock-step"""
+    return delay * random.uniform(0.8, 1.2)
+
+
+def file_size(path) -> Optional[int]:
+    """Size of a file in bytes, or None if it does not exist (one stat call)"""
+    try:
+        return os.stat(path).st_size
+    except FileNotFoundError:
+        return None
+
+
+class DrainingTCPConnector(aiohttp.TCPConnector):
+    """TCPConnector whose sockets have an asyncio write-buffer high-water mark of 0
+    
+    Large request bodies (processed JPEG uploads) then wait for the kernel to take
+    each chunk instead of piling up a second copy in the transport's buffer.
+    Small requests are unaffected: they are written to the socket immediately.
+    """
+    
+    async def _create_connection(self, req, traces, timeout):
+        protocol = await super()._create_connection(req, traces, timeout)
+        if protocol.transport is not None:
+            protocol.transport.set_write_buffer_limits(high=0)
+        return protocol
+
+
+class OutputFileWatcher:
+    """Watch one file's (existing) directory and wake an asyncio waiter when that file is written
+    
+    Backends, in order: inotify (inotify_simple), FSEvents (macfsevents), then the
+    stdlib kqueue on macOS/BSD. A kqueue directory watch only reports entry changes
+    (the file appearing or being renamed into place), so once the file exists it
+    is watched too, for writes that extend it.
+    """
+    
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.directory = os.path.dirname(file_path) or '.'
+        self.name = os.path.basename(file_path)
+        self._changed = asyncio.Event()
+        self._loop = None
+        self._inotify = None
+        self._observer = None
+        self._stream = None
+        self._kqueue = None
+        self._dir_fd = None
+        self._file_fd = None
+    
+    def start(self) -> bool:
+        """Start watching; returns False when no file event backend is available"""
+        self._loop = asyncio.get_running_loop()
+        # Only an existing directory can be watched; waiting never creates one
+        if not os.path.isdir(self.directory):
+            return False
+        try:
+            if INotify is not None:
+                self._inotify = INotify()
+                self._inotify.add_watch(self.directory, inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO)
+                self._loop.add_reader(self._inotify.fileno(), self._on_inotify)
+                return True
+            if FSEventsObserver is not None:
+                self._observer = FSEventsObserver()
+                self._observer.start()
+                self._stream = FSEventsStream(self._on_fsevent, self.directory, file_events=True)
+                self._observer.schedule(self._stream)
+                return True
+            if hasattr(select, 'kqueue'):
+                self._dir_fd = os.open(self.directory, getattr(os, 'O_EVTONLY', os.O_RDONLY))
+                self._kqueue = select.kqueue()
+                self._kqueue.control([select.kevent(
+                    self._dir_fd,
+                    filter=select.KQ_FILTER_VNODE,
+                    flags=select.KQ_EV_ADD | select.KQ_EV_CLEAR,
+                    fflags=select.KQ_NOTE_WRITE
+                )], 0, 0)
+                self._watch_file_kqueue()
+                self._loop.add_reader(self._kqueue.fileno(), self._on_kqueue)
+                return True
+        except Exception as e:
+            print(f"    ⚠️ Failed to start file watcher: {e}")
+            self.close()
+        return False
+    
+    def _on_inotify(self):
+        for event in self._inotify.read(timeout=0):
+            if event.name == self.name:
+                self._changed.set()
+    
+    def _on_kqueue(self):
+        events = self._kqueue.control(None, 16, 0)
+        # A directory entry change may be our file appearing or being replaced:
+        # (re)attach the watch on the file itself
+        if self._file_fd is None or any(event.ident == self._dir_fd for event in events):
+            self._watch_file_kqueue()
+        self._changed.set()
+    
+    def _watch_file_kqueue(self):
+        """Watch the file (if it exists yet) for writes; closing the old fd drops its kevent"""
+        try:
+            fd = os.open(self.file_path, getattr(os, 'O_EVTONLY', os.O_RDONLY))
+        except OSError:
+            return
+        if self._file_fd is not None:
+            os.close(self._file_fd)
+        self._file_fd = fd
+        self._kqueue.control([select.kevent(
+            fd,
+            filter=select.KQ_FILTER_VNODE,
+            flags=select.KQ_EV_ADD | select.KQ_EV_CLEAR,
+            fflags=select.KQ_NOTE_WRITE | select.KQ_NOTE_EXTEND
+        )], 0, 0)
+    
+    def _on_fsevent(self, event):
+        # Called on the FSEvents observer thread
+        if os.path.basename(event.name) == self.name:
+            self._loop.call_soon_threadsafe(self._changed.set)
+    
+    async def wait(self, timeout: float) -> Optional[int]:
+        """Wait until the file exists and is non-empty; returns its size, or None on timeout"""
+        deadline = time.monotonic() + timeout
+        while True:
+            # Clear before checking so a write between the check and the wait is not missed
+            self._changed.clear()
+            size = file_size(self.file_path)
+            if size:
+                return size
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                await asyncio.wait_for(self._changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+    
+    def close(self):
+        """Stop watching and release resources"""
+        if self._inotify is not None:
+            try:
+                self._loop.remove_reader(self._inotify.fileno())
+                self._inotify.close()
+            except Exception:
+                pass
+            self._inotify = None
+        if self._observer is not None:
+            try:
+                if self._stream is not None:
+                    self._observer.unschedule(self._stream)
+                self._observer.stop()
+            except Exception:
+                pass
+            self._observer = None
+            self._stream = None
+        if self._kqueue is not None:
+            try:
+                self._loop.remove_reader(self._kqueue.fileno())
+                self._kqueue.close()
+            except Exception:
+                pass
+            self._kqueue = None
+        for fd in (self._dir_fd, self._file_fd):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self._dir_fd = None
+        self._file_fd = None
+
+
+class ArrivalHistogram:
+    """Empirical distribution of the gaps between consecutive tasks from one server"""
+    
+    def __init__(self, max_samples: int = 500, bins: int = 64):
+        self.samples = deque(maxlen=max_samples)  # Most recent inter-arrival gaps (seconds)
+        self.bins = bins
+        self._table = None  # (upper, bin_width, densities, cumulative), rebuilt after each push
+    
+    def __len__(self):
+        return len(self.samples)
+    
+    def push(self, gap: float):
+        """Record one inter-arrival gap"""
+        if gap > 0:
+            self.samples.append(gap)
+            self._table = None
+    
+    def _build(self):
+        if self._table is None:
+            ordered = sorted(self.samples)
+            # The histogram covers [0, U] with U the 99th percentile, so rare outliers don't flatten it
+            upper = ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))]
+            width = upper / self.bins
+            counts = [0] * self.bins
+            for gap in ordered:
+                if gap <= upper:
+                    counts[min(int(gap / width), self.bins - 1)] += 1
+            total = len(ordered)
+            densities = [count / (total * width) for count in counts]
+            cumulative = list(accumulate(count / total for count in counts))
+            self._table = (upper, width, densities, cumulative)
+        return self._table
+    
+    @property
+    def upper(self) -> float:
+        """Upper bound U of the histogram"""
+        return self._build()[0]
+    
+    @property
+    def bin_width(self) -> float:
+        """Width of one histogram bin"""
+        return self._build()[1]
+    
+    def pdf(self, t: float) -> float:
+        """Probability density of a gap of t seconds"""
+        upper, width, densities, _ = self._build()
+        if t < 0 or t >= upper:
+            return 0.0
+        return densities[min(int(t / width), self.bins - 1)]
+    
+    def cdf(self, t: float) -> float:
+        """Probability that a gap is at most t seconds (linear within a bin)"""
+        upper, width, _, cumulative = self._build()
+        if t <= 0:
+            return 0.0
+        if t >= upper:
+            return cumulative[-1]
+        i = min(int(t / width), self.bins - 1)
+        before = cumulative[i - 1] if i > 0 else 0.0
+        return before + (cumulative[i] - before) * (t / width - i)
+
+
 class LightroomReverseClient:
     """Mac reverse connection client - Supports multi-server polling - Adapted to message center state machine"""
     
@@ -40,7 +323,8 @@ class LightroomReverseClient:
                  max_consecutive_failures: int = 5,
                  connection_retry_delay: float = 5.0,
                  health_check_interval: float = 30.0,
-                 max_empty_polls: int = 50):
+                 max_empty_polls: int = 50,
+                 race_polls: bool = False):
         # Parse server configuration
         if servers:
             # Multi-server mode: "ip1:port1,ip2:port2"
@@ -51,7 +335,8 @@ class LightroomReverseClient:
                     'ip': ip,
                     'port': int(port),
                     'url': f"http://{ip}:{port}",
-                    'available': True,
+                    'unavailable_until': 0.0,  # time.monotonic() deadline of the failure cooldown
+                    'retry_backoff': 1.0,
                     'last_error': None
                 })
         elif server_ip:
@@ -60,7 +345,8 @@ class LightroomReverseClient:
                 'ip': server_ip,
                 'port': server_port,
                 'url': f"http://{server_ip}:{server_port}",
-                'available': True,
+                'unavailable_until': 0.0,
+                'retry_backoff': 1.0,
                 'last_error': None
             }]
         else:
@@ -71,21 +357,28 @@ class LightroomReverseClient:
         self.poll_interval = poll_interval
         self.session = None
         self.running = False
-        self.current_server_index = 0  # Polling server index
         
         # Connection recovery configuration
         self.max_consecutive_failures = max_consecutive_failures  # Maximum consecutive failures
         self.connection_retry_delay = connection_retry_delay  # Connection retry delay
         self.health_check_interval = health_check_interval  # Health check interval
-        self.last_health_check = 0  # Last health check time
+        self.last_health_check = float('-inf')  # Last health check time (time.monotonic())
         
         # Polling statistics
-        self.task_counts = {}  # Record task count for each server
-        self.last_poll_time = {}  # Record last poll time for each server
         self.consecutive_empty_polls = 0  # Consecutive empty poll count
         self.max_empty_polls = max_empty_polls  # Consecutive empty poll threshold, print log after exceeding
         self.base_poll_interval = poll_interval  # Save base polling interval
-        self.current_poll_interval = poll_interval  # Current polling interval, always keep fixed value
+        self.current_poll_interval = poll_interval  # Current polling interval, placed by task arrival history
+        self.min_poll_interval = 0.2  # Hard floor for adaptive poll placement
+        self.min_arrival_samples = 20  # Gaps needed before the arrival histogram is trusted
+        self.arrival_histograms = {}  # Inter-task gap distribution for each server
+        self._poll_schedules = {}  # Cached poll offsets (seconds after last task) for each server
+        self._empty_backoff = poll_interval  # Grows 1.5x per empty round (max 10s, or the base interval if longer) while no schedule applies
+        self._error_backoff = connection_retry_delay  # Grows 1.5x per round with poll errors (max 60s, or the retry delay if longer)
+        self.race_polls = race_polls  # Poll all servers at once and take the first task, instead of round-robin
+        self._claimed_tasks = deque()  # Extra tasks from raced polls, already confirmed with their server
+        self._late_polls = set()  # Raced polls still in flight
+        self._claim_confirmations = set()  # start_processing calls for extra raced tasks still in flight
         
         # Unified timeout/delay configuration
         self.http_timeout_total = http_timeout_total
@@ -100,18 +393,47 @@ class LightroomReverseClient:
         self.file_check_interval = file_check_interval
         self.test_timeout = test_timeout
         
+        # Timeouts and endpoint URLs reused on every poll, built once
+        self._poll_timeout = aiohttp.ClientTimeout(total=10.0)
+        self._health_timeout = aiohttp.ClientTimeout(total=5.0)
+        self._processing_timeouts = {}  # (lua path, mtime_ns, size) -> processing timeout, oldest first
+        self._processing_timeouts_by_content = {}  # Lua content digest -> processing timeout, oldest first
+        self._processing_client_timeouts = {}  # Total seconds -> ClientTimeout for the Lightroom request
+        self._health_url = {}
+        self._register_url = {}
+        self._get_task_url = {}
+        self._start_processing_url = {}  # Prefix, the task id is appended
+        self._report_url = {}
+        self._upload_url = {}
+        self._report_with_image_url = {}
+        self._supports_report_with_image = {}  # False once a server is known to lack the combined endpoint
+        
+        self._server_cycle = cycle(self.servers)  # Round-robin polling order, resumes where the last round stopped
+        
         # Initialize server statistics
         for server in self.servers:
-            self.task_counts[server['url']] = 0
-            self.last_poll_time[server['url']] = 0
+            url = server['url']
+            self._health_url[url] = f"{url}/api/health"
+            self._register_url[url] = f"{url}/api/register_client"
+            self._get_task_url[url] = f"{url}/api/get_task/{self.client_id}"
+            self._start_processing_url[url] = f"{url}/api/start_processing/"
+            self._report_url[url] = f"{url}/api/report_result"
+            self._upload_url[url] = f"{url}/api/upload_result"
+            self._report_with_image_url[url] = f"{url}/api/report_with_image"
+            self._supports_report_with_image[url] = True
+            server['task_count'] = 0  # Tasks received from this server
+            server['last_poll_time'] = 0.0  # Last task time (time.monotonic()), 0 = never
+            self.arrival_histograms[server['url']] = ArrivalHistogram()
         
     async def start(self):
         """Start the client"""
         # Create HTTP session with more relaxed connection configuration
-        connector = aiohttp.TCPConnector(
+        connector = DrainingTCPConnector(
             limit=self.connector_limit,
-            limit_per_host=5,  # Maximum 5 connections per host
-            keepalive_timeout=30,  # Keep-alive timeout
+            limit_per_host=8,  # Room for polling plus parallel photo/XMP downloads per host
+            keepalive_timeout=75,  # Keep idle sockets across quiet polling periods (nginx default)
+            force_close=False,  # Reuse connections between polls
+            ttl_dns_cache=300,  # Resolve each server host once every 5 minutes, not on every poll
             enable_cleanup_closed=True  # Enable cleanup of closed connections
         )
         
@@ -123,7 +445,10 @@ class LightroomReverseClient:
         
         self.session = aiohttp.ClientSession(
             timeout=timeout,
-            connector=connector
+            connector=connector,
+            json_serialize=json_dumps,
+            read_bufsize=2**20,  # Let a fast server stay ahead of the disk by up to 1 MiB per response
+            headers={"Connection": "keep-alive"}  # Ask intermediate proxies to keep sockets open too
         )
         self.running = True
         
@@ -141,9 +466,10 @@ class LightroomReverseClient:
         while not connection_success:
             # Test connection
             print(f"Attempting to connect to servers (attempt {retry_count+1})...")
-            if await self.test_connections():
-                # Register client after successful connection
-                if await self.register():
+            connected, registered = await self.connect_and_register()
+            if connected:
+                # Each server was registered right after its connection test passed
+                if registered:
                     connection_success = True
                     print("✅ Server connection and registration successful")
                 else:
@@ -162,7 +488,7 @@ class LightroomReverseClient:
             if not connection_success:
                 # Use fixed retry interval
                 print(f"⏳ Waiting {self.connection_retry_delay} seconds before retrying connection...")
-                await asyncio.sleep(self.connection_retry_delay)
+                await asyncio.sleep(jittered(self.connection_retry_delay))
         
         print("✅ Startup complete, starting to poll for tasks...")
         print("Press Ctrl+C to stop the client\n")
@@ -170,36 +496,26 @@ class LightroomReverseClient:
         # Start polling for tasks
         await self.poll_loop()
     
-    async def test_connections(self) -> bool:
-        """Test all server connections"""
-        available_servers = 0
-        
-        # Test all server connections
-        for i, server in enumerate(self.servers):
-            try:
-                async with self.session.get(f"{server['url']}/api/health") as response:
-                    if response.status == 200:
-                        health_data = await response.json()
-                        print(f"✅ Server {server['url']} connection OK (version: {health_data.get('version', 'unknown')})")
-                        server['available'] = True
-                        server['last_error'] = None
-                        available_servers += 1
-                    else:
-                        print(f"❌ Server {server['url']} abnormal response: {response.status}")
-                        server['available'] = False
-                        server['last_error'] = f"HTTP {response.status}"
-            except Exception as e:
-                print(f"❌ Server {server['url']} connection failed: {e}")
-                server['available'] = False
-                server['last_error'] = str(e)
-        
-        if available_servers == 0:
-            print("❌ All servers are unreachable")
+    async def _probe_server(self, server: Dict) -> bool:
+        """Check one server's health endpoint and record its availability"""
+        try:
+            async with self.session.get(self._health_url[server['url']]) as response:
+                if response.status == 200:
+                    health_data = json_loads(await response.read())
+                    print(f"✅ Server {server['url']} connection OK (version: {health_data.get('version', 'unknown')})")
+                    self.set_server_available(server)
+                    return True
+                else:
+                    print(f"❌ Server {server['url']} abnormal response: {response.status}")
+                    self.start_server_cooldown(server, f"HTTP {response.status}")
+                    return False
+        except Exception as e:
+            print(f"❌ Server {server['url']} connection failed: {e}")
+            self.start_server_cooldown(server, str(e))
             return False
-        
-        print(f"✅ {available_servers}/{len(self.servers)} servers connected successfully")
-        
-        # Test local Lightroom - use POST request for testing
+    
+    async def _probe_local_lightroom(self) -> bool:
+        """Check that the local Lightroom API server answers - use POST request for testing"""
         try:
             test_payload = {
                 "photo_path": "test_connection", 
@@ -209,6 +525,7 @@ class LightroomReverseClient:
                 # Lightroom service responds even with invalid data, we're just testing connectivity
                 if response.status in [200, 400, 500]:  # Any HTTP response indicates service is available
                     print("✅ Local Lightroom service is OK")
+                    return True
                 else:
                     print(f"❌ Local Lightroom abnormal response: {response.status}")
                     return False
@@ -216,12 +533,10 @@ class LightroomReverseClient:
             print(f"❌ Local Lightroom connection failed: {e}")
             print("Please ensure test_lightroom_api.py is running")
             return False
-        
-        return True
     
     async def register_single_server(self, server: Dict) -> bool:
         """Register to a single server"""
-        if not server['available']:
+        if not self.is_server_available(server):
             return False
             
         registration_data = {
@@ -235,7 +550,7 @@ class LightroomReverseClient:
         
         try:
             async with self.session.post(
-                f"{server['url']}/api/register_client",
+                self._register_url[server['url']],
                 json=registration_data
             ) as response:
                 if response.status == 200:
@@ -243,38 +558,93 @@ class LightroomReverseClient:
                     return True
                 else:
                     print(f"❌ Registration failed {server['url']}: {response.status}")
-                    server['available'] = False
+                    self.start_server_cooldown(server, f"Registration failed: HTTP {response.status}")
                     return False
         except Exception as e:
             print(f"❌ Registration exception {server['url']}: {e}")
-            server['available'] = False
+            self.start_server_cooldown(server, f"Registration exception: {e}")
             return False
     
-    async def register(self) -> bool:
-        """Register to all available servers"""
-        successful_registrations = 0
+    async def _prime_connections(self, server: Dict, count: int = 2):
+        """Open `count` pooled keep-alive sockets to a server ahead of its first task
         
-        for server in self.servers:
-            if await self.register_single_server(server):
-                successful_registrations += 1
+        Task photo and XMP files are downloaded in parallel, so each needs its own
+        connection; opening them now takes the TCP handshakes off the task path.
+        """
+        async def touch():
+            try:
+                async with self.session.get(self._health_url[server['url']], timeout=self._health_timeout) as response:
+                    await response.read()
+            except Exception:
+                pass
+        
+        await asyncio.gather(*(touch() for _ in range(count)))
+    
+    async def connect_and_register(self):
+        """Test connections and register, pipelined per server
+        
+        Each server is registered as soon as its own health check and the local
+        Lightroom check have passed, instead of waiting for every probe first;
+        startup takes the slowest probe+register chain rather than the slowest
+        probe plus the slowest registration.
+        
+        Returns:
+            tuple[bool, bool]: (connection test passed, registered to at least one server)
+        """
+        local_probe = asyncio.ensure_future(self._probe_local_lightroom())
+        
+        async def bring_up(server):
+            if not await self._probe_server(server):
+                return False, False
+            if not await asyncio.shield(local_probe):
+                return True, False
+            registered = await self.register_single_server(server)
+            if registered:
+                await self._prime_connections(server)
+            return True, registered
         
+        results = await asyncio.gather(*map(bring_up, self.servers))
+        local_ok = await local_probe
+        available_servers = sum(reachable for reachable, _ in results)
+        
+        if available_servers == 0:
+            print("❌ All servers are unreachable")
+            return False, False
+        
+        print(f"✅ {available_servers}/{len(self.servers)} servers connected successfully")
+        if not local_ok:
+            return False, False
+        
+        successful_registrations = sum(registered for _, registered in results)
         if successful_registrations == 0:
             print("❌ All server registrations failed")
-            return False
+            return True, False
         
         print(f"✅ Successfully registered to {successful_registrations} servers")
-        return True
+        return True, True
+    
+    def _servers_in_turn(self, now: float):
+        """Yield each available server once, in round-robin order
+        
+        Stopping early (a task was found) leaves the cycle just past that server,
+        so the next round starts from the following one.
+        """
+        for _ in range(len(self.servers)):
+            server = next(self._server_cycle)
+            if now >= server['unavailable_until']:
+                yield server
     
     async def poll_loop(self):
         """Main polling loop - Fair polling of all available servers (improved version)"""
         consecutive_failures = 0
-        last_task_time = time.time()
+        last_task_time = time.monotonic()
         reconnect_attempts = 0
         
         while self.running:
             try:
-                current_time = time.time()
+                current_time = time.monotonic()
                 task_found = False
+                poll_errors = False
                 
                 # Periodic health check and statistics display
                 if current_time - self.last_health_check > self.health_check_interval:
@@ -285,121 +655,272 @@ class LightroomReverseClient:
                     # Display polling statistics
                     await self.show_polling_statistics()
                 
-                # Get all available servers
-                available_servers = [s for s in self.servers if s['available']]
+                # Get all servers whose failure cooldown has expired
+                now = time.monotonic()
+                available_servers = [s for s in self.servers if now >= s['unavailable_until']]
                 
                 if not available_servers:
                     # Use fixed time interval for reconnection
                     reconnect_attempts += 1
                     
                     print(f"⚠️ No available servers, retrying connection after {self.connection_retry_delay:.1f} seconds... (Reconnect attempt {reconnect_attempts})")
-                    await asyncio.sleep(self.connection_retry_delay)
+                    await asyncio.sleep(jittered(self.connection_retry_delay))
                     
-                    # Try to reconnect all servers
-                    connection_success = await self.test_connections()
-                    
-                    # If reconnection successful, try to re-register
-                    if connection_success:
-                        register_success = await self.register()
-                        if register_success:
-                            print("✅ Reconnection and registration successful, continuing to poll for tasks")
-                            reconnect_attempts = 0  # Reset reconnect count
+                    # Try to reconnect and re-register all servers
+                    connection_success, register_success = await self.connect_and_register()
+                    if register_success:
+                        print("✅ Reconnection and registration successful, continuing to poll for tasks")
+                        reconnect_attempts = 0  # Reset reconnect count
                     
                     continue
                 
-                # Implement polling schedule: start from current index, check each server in turn
-                servers_to_check = []
-                for i in range(len(available_servers)):
-                    # Calculate actual server index (round-robin)
-                    actual_index = (self.current_server_index + i) % len(available_servers)
-                    servers_to_check.append(available_servers[actual_index])
+                # Implement polling schedule: continue the round-robin, check each available server in turn
+                servers_to_check = self._servers_in_turn(now)
                 
-                # Poll all available servers, but use polling order
-                for server in servers_to_check:
-                    try:
-                        # Use shorter timeout for task polling
-                        poll_timeout = aiohttp.ClientTimeout(total=10.0)
-                        async with self.session.get(
-                            f"{server['url']}/api/get_task/{self.client_id}",
-                            timeout=poll_timeout
-                        ) as response:
-                            if response.status == 200:
-                                task = await response.json()
-                                
-                                if task and task.get('task_id'):
-                                    consecutive_failures = 0
-                                    last_task_time = current_time
-                                    task['source_server'] = server  # Record task source server
-                                    print(f"🎆 Got task from {server['url']}: {task.get('task_id')}")
-                                    
-                                    # Update statistics
-                                    self.task_counts[server['url']] += 1
-                                    self.last_poll_time[server['url']] = current_time
-                                    self.consecutive_empty_polls = 0  # Reset empty poll count
-                                    
-                                    # Intelligently adjust polling interval: restore base interval when task found
-                                    self.current_poll_interval = self.base_poll_interval
-                                    
-                                    # Update server index, start from next server next time
-                                    server_index_in_available = available_servers.index(server)
-                                    self.current_server_index = (server_index_in_available + 1) % len(available_servers)
-                                    
-                                    await self.process_task(task)
-                                    task_found = True
-                                    break  # Stop this round of polling after finding a task
-                            elif response.status == 404:
-                                # No task, normal situation, continue checking next server
-                                pass
-                            else:
-                                print(f"⚠️ Server {server['url']} failed to get task: {response.status}")
-                                await self.mark_server_unavailable(server, f"HTTP {response.status}")
+                # A raced poll that lost may still have claimed a task: run those first.
+                # Only race again once every earlier raced poll has come back
+                if self._claimed_tasks:
+                    task, failures = self._claimed_tasks.popleft(), 0
+                elif self.race_polls and len(available_servers) > 1 and not self._late_polls:
+                    task, failures = await self._race_polls(list(servers_to_check))
+                else:
+                    # Poll all available servers, but use polling order
+                    task, failures = None, 0
+                    for server in servers_to_check:
+                        task, failed = await self._try_poll(server)
+                        failures += failed
+                        if task:
+                            break  # Stop this round of polling after finding a task
+                
+                if failures:
+                    consecutive_failures += failures
+                    poll_errors = True
+                
+                if task:
+                    server = task['source_server']
+                    consecutive_failures = 0
+                    last_task_time = current_time
+                    print(f"🎆 Got task from {server['url']}: {task.get('task_id')}")
                     
-                    except asyncio.TimeoutError:
-                        print(f"⚠️ Server {server['url']} polling timeout")
-                        await self.mark_server_unavailable(server, "Timeout")
-                        consecutive_failures += 1
-                    except Exception as e:
-                        print(f"⚠️ Server {server['url']} polling exception: {e}")
-                        await self.mark_server_unavailable(server, str(e))
-                        consecutive_failures += 1
+                    # Update statistics and the server's task arrival history
+                    last_task_at = server['last_poll_time']
+                    if last_task_at > 0:
+                        self.arrival_histograms[server['url']].push(current_time - last_task_at)
+                        self._poll_schedules.pop(server['url'], None)
+                    server['task_count'] += 1
+                    server['last_poll_time'] = current_time
+                    self.consecutive_empty_polls = 0  # Reset empty poll count
+                    
+                    await self.process_task(task)
+                    task_found = True
                 
                 # If no task found, update polling index and statistics
                 if not task_found and available_servers:
-                    self.current_server_index = (self.current_server_index + 1) % len(available_servers)
+                    # A full empty lap ends where it started: shift the next round's first server by one
+                    next(self._server_cycle)
                     self.consecutive_empty_polls += 1
                     
-                    # Use fixed polling interval, no longer adjust based on empty poll count
-                    self.current_poll_interval = self.base_poll_interval
-                    
-                    # If consecutive empty polls exceed threshold, print log but don't adjust interval
+                    # If consecutive empty polls exceed threshold, print log
                     if self.consecutive_empty_polls > self.max_empty_polls and self.consecutive_empty_polls % 10 == 0:
-                        print(f"🔄 {self.consecutive_empty_polls} consecutive empty polls, keeping fixed interval {self.current_poll_interval:.1f}s")
+                        print(f"🔄 {self.consecutive_empty_polls} consecutive empty polls, current interval {self.current_poll_interval:.1f}s")
                     
-                    print(f"🔄 No task this round, next poll starts from server index {self.current_server_index} ({available_servers[self.current_server_index]['url']})")
+                    print(f"🔄 No task this round from {len(available_servers)} servers")
                 
                 # If too many consecutive failures, try to reconnect all servers
                 if consecutive_failures >= self.max_consecutive_failures:
                     print(f"🔄 {consecutive_failures} consecutive failures, attempting to reconnect all servers...")
-                    await asyncio.sleep(self.connection_retry_delay)
-                    connection_success = await self.test_connections()
-                    
-                    # If reconnection successful, try to re-register
-                    if connection_success:
-                        register_success = await self.register()
-                        if register_success:
-                            print("✅ Reconnection and registration successful, continuing to poll for tasks")
+                    await asyncio.sleep(jittered(self.connection_retry_delay))
+                    connection_success, register_success = await self.connect_and_register()
+                    if register_success:
+                        print("✅ Reconnection and registration successful, continuing to poll for tasks")
                     
                     consecutive_failures = 0
                 
-                # Use intelligently adjusted polling interval
-                sleep_time = self.current_poll_interval
+                if task_found:
+                    # Work is flowing again: drop both backoffs
+                    self._empty_backoff = self.base_poll_interval
+                    self._error_backoff = self.connection_retry_delay
+                    sleep_time = min(self.next_poll_delay(s) for s in available_servers)
+                elif poll_errors:
+                    sleep_time = self._error_backoff
+                    self._error_backoff = min(max(60.0, self.connection_retry_delay), self._error_backoff * 1.5)
+                else:
+                    # Poll again when the earliest server is next expected to have a task
+                    self._error_backoff = self.connection_retry_delay
+                    sleep_time = min(self.next_poll_delay(s) for s in available_servers)
+                    self._empty_backoff = min(max(10.0, self.base_poll_interval), self._empty_backoff * 1.5)
+                self.current_poll_interval = sleep_time
                 
-                await asyncio.sleep(sleep_time)
+                await asyncio.sleep(jittered(sleep_time))
                 
             except Exception as e:
                 print(f"⚠️ Polling loop exception: {e}")
                 consecutive_failures += 1
-                await asyncio.sleep(self.connection_retry_delay)
+                await asyncio.sleep(jittered(self.connection_retry_delay))
+    
+    def _poll_schedule(self, history: ArrivalHistogram) -> list:
+        """Poll offsets after the last task that minimise expected detection latency
+        
+        Offsets follow L_i = L_{i-1} + (F(L_{i-1}) - F(L_{i-2})) / p(L_{i-1}) up to the histogram
+        bound U. The first offset is bisected so the expected polls per gap, sum(1 - F(L_i)),
+        match the fixed-rate budget (k = 86400 / base_poll_interval a day, mean_gap / base_poll_interval a gap).
+        """
+        upper = history.upper
+        floor = min(self.min_poll_interval, upper)
+        budget = max(1.0, sum(history.samples) / len(history) / self.base_poll_interval)
+        
+        def place(first):
+            points = [first]
+            previous = 0.0
+            while points[-1] < upper:
+                current = points[-1]
+                density = history.pdf(current)
+                # An empty bin carries no mass: step over it rather than jumping ahead
+                step = (history.cdf(current) - history.cdf(previous)) / density if density > 0 else history.bin_width
+                points.append(current + min(max(step, floor), upper))
+                previous = current
+            return points
+        
+        def expected_polls(points):
+            return sum(1.0 - history.cdf(point) for point in points)
+        
+        low, high = floor, upper
+        for _ in range(20):
+            middle = (low + high) / 2
+            if expected_polls(place(middle)) > budget:
+                low = middle
+            else:
+                high = middle
+        return [point for point in place(high) if point <= upper]
+    
+    def next_poll_delay(self, server: Dict) -> float:
+        """Delay until the next poll of a server, placed by its task arrival distribution"""
+        server_url = server['url']
+        history = self.arrival_histograms[server_url]
+        last_task_at = server['last_poll_time']
+        if last_task_at <= 0 or len(history) < self.min_arrival_samples:
+            return self._empty_backoff
+        
+        schedule = self._poll_schedules.get(server_url)
+        if schedule is None:
+            schedule = self._poll_schedules[server_url] = self._poll_schedule(history)
+        
+        elapsed = time.monotonic() - last_task_at
+        for offset in schedule:
+            if offset > elapsed:
+                return min(max(offset - elapsed, self.min_poll_interval), history.upper)
+        # Past every observed gap: nothing to place polls by, back off like any empty poll
+        return self._empty_backoff
+    
+    async def _try_poll(self, server: Dict):
+        """Poll one server for a task
+        
+        Returns:
+            tuple[Optional[Dict], bool]: (task tagged with its source server or None, whether the poll failed)
+        """
+        try:
+            # Use shorter timeout for task polling
+            async with self.session.get(
+                self._get_task_url[server['url']],
+                timeout=self._poll_timeout
+            ) as response:
+                if response.status in (200, 404):
+                    # Server answered normally: clear any failure cooldown
+                    if server['last_error'] is not None:
+                        self.set_server_available(server)
+                if response.status == 200:
+                    task = json_loads(await response.read())
+                    
+                    if task and task.get('task_id'):
+                        task['source_server'] = server  # Record task source server
+                        return task, False
+                elif response.status == 404:
+                    # No task, normal situation
+                    pass
+                else:
+                    print(f"⚠️ Server {server['url']} failed to get task: {response.status}")
+                    await self.mark_server_unavailable(server, f"HTTP {response.status}")
+            return None, False
+        
+        except asyncio.TimeoutError:
+            print(f"⚠️ Server {server['url']} polling timeout")
+            await self.mark_server_unavailable(server, "Timeout")
+            return None, True
+        except Exception as e:
+            print(f"⚠️ Server {server['url']} polling exception: {e}")
+            await self.mark_server_unavailable(server, str(e))
+            return None, True
+    
+    async def _race_polls(self, servers):
+        """Poll all servers concurrently and return as soon as one yields a task
+        
+        The other polls are left running rather than cancelled: the server hands
+        out a task when it answers, so a cancelled request could strand it. Tasks
+        they bring back are confirmed straight away (the server would otherwise
+        hand them to another client after read_timeout) and queued in
+        _claimed_tasks for the next rounds.
+        
+        Returns:
+            tuple[Optional[Dict], int]: (first task or None, number of failed polls)
+        """
+        pending = {asyncio.create_task(self._try_poll(server)) for server in servers}
+        task, failures = None, 0
+        while pending and task is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for poll in done:
+                found, failed = poll.result()
+                failures += failed
+                if found is None:
+                    continue
+                if task is None:
+                    task = found
+                else:
+                    self._claim_extra_task(found)
+        
+        for poll in pending:
+            self._late_polls.add(poll)
+            poll.add_done_callback(self._collect_late_poll)
+        return task, failures
+    
+    def _collect_late_poll(self, poll: asyncio.Task):
+        """Queue the task of a raced poll that completed after the round was decided"""
+        self._late_polls.discard(poll)
+        if poll.cancelled():
+            return
+        found, _ = poll.result()
+        if found is not None:
+            self._claim_extra_task(found)
+    
+    def _claim_extra_task(self, task: Dict[str, Any]):
+        """Confirm an extra raced task in the background, queueing it once confirmed"""
+        confirmation = asyncio.create_task(self._confirm_extra_task(task))
+        self._claim_confirmations.add(confirmation)
+        confirmation.add_done_callback(self._claim_confirmations.discard)
+    
+    async def _confirm_extra_task(self, task: Dict[str, Any]):
+        try:
+            confirmed = await self.confirm_processing(task)
+        except Exception as e:
+            print(f"  ❌ Confirm processing failed: {e}")
+            confirmed = False
+        if confirmed:
+            self._claimed_tasks.append(task)
+        else:
+            print(f"  ⚠️ Dropped raced task {task.get('task_id')} from {task['source_server']['url']}")
+    
+    async def confirm_processing(self, task: Dict[str, Any]) -> bool:
+        """Confirm start processing to the task's source server - state transition reading -> processing"""
+        source_server = task['source_server']
+        async with self.session.post(
+            self._start_processing_url[source_server['url']] + str(task['task_id']),
+            json={"client_id": self.client_id}
+        ) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                print(f"  ❌ Confirm processing failed: {error_text}")
+                return False
+        task['confirmed'] = True
+        return True
     
     async def process_task(self, task: Dict[str, Any]) -> bool:
         """Process task - Complete message center state machine flow (supports multi-server)"""
@@ -411,22 +932,18 @@ class LightroomReverseClient:
         source_server = task.get('source_server')  # Task source server
         
         print(f"\n📸 Received task {task_id} (source: {source_server['url']})")
-        print(f"  Photo: {Path(photo_path).name}")
-        print(f"  XMP: {Path(xmp_path).name}")
+        print(f"  Photo: {os.path.basename(photo_path)}")
+        print(f"  XMP: {os.path.basename(xmp_path)}")
         print(f"  Read timeout: {read_timeout}s")
         
-        start_time = time.time()
+        start_time = time.monotonic()
         
         try:
             # 1. Confirm start processing to source server - state transition reading -> processing
-            print(f"  🔄 Confirming start processing...")
-            async with self.session.post(
-                f"{source_server['url']}/api/start_processing/{task_id}",
-                json={"client_id": self.client_id}
-            ) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    print(f"  ❌ Confirm processing failed: {error_text}")
+            # (extra tasks from raced polls were confirmed when they were claimed)
+            if not task.get('confirmed'):
+                print(f"  🔄 Confirming start processing...")
+                if not await self.confirm_processing(task):
                     return False
             
             # 2. If files need to be downloaded, download from source server to local
@@ -437,45 +954,52 @@ class LightroomReverseClient:
                 xmp_path = str(task_dir / "config.lua")
             
             # 3. Check if files exist
-            if not Path(photo_path).exists():
+            if not os.path.exists(photo_path):
                 raise FileNotFoundError(f"Photo file does not exist: {photo_path}")
             
-            if not Path(xmp_path).exists():
+            if not os.path.exists(xmp_path):
                 raise FileNotFoundError(f"XMP file does not exist: {xmp_path}")
             
             # 4. Check lua configuration complexity, set appropriate processing timeout
             processing_timeout = await self.calculate_processing_timeout(xmp_path)
             
             # 5. Send to local Lightroom for processing
+            # The local API waits at most processing_timeout for the export, so it answers
+            # before this request's timeout (processing_timeout + extra buffer) expires
             payload = {
                 "photo_path": photo_path,
                 "xmp_path": xmp_path,
-                "task_id": task_id
+                "task_id": task_id,
+                "wait_timeout": processing_timeout
             }
             
             print(f"  🔄 Sending to Lightroom for processing (estimated time: {processing_timeout}s)...")
             
             # Use HTTP client with dynamic timeout
-            timeout = aiohttp.ClientTimeout(total=processing_timeout + self.processing_extra_buffer)  # Extra buffer
+            total = processing_timeout + self.processing_extra_buffer  # Extra buffer
+            timeout = self._processing_client_timeouts.get(total)
+            if timeout is None:
+                timeout = self._processing_client_timeouts[total] = aiohttp.ClientTimeout(total=total)
             async with self.session.post(
                 self.local_url,
                 json=payload,
                 timeout=timeout
             ) as response:
-                elapsed = time.time() - start_time
+                elapsed = time.monotonic() - start_time
                 success = response.status == 200
                 processed_image_path = None
+                output_size = None
                 
                 if success:
                     try:
-                        result_data = await response.json()
+                        result_data = json_loads(await response.read())
                         processed_image_path = result_data.get('output_path')
                         print(f"  ✅ Processing successful ({elapsed:.1f}s)")
                         
-                        # Detailed path debugging information
-                        print(f"  🔍 Debug info:")
-                        print(f"     - Lightroom returned output_path: {processed_image_path}")
-                        print(f"     - Full response data: {result_data}")
+                        # Detailed path debugging information (enable with DEBUG logging)
+                        logger.debug("Task %s: Lightroom returned output_path: %s", task_id, processed_image_path)
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug("Task %s: full response data: %r", task_id, result_data)
                         
                         # If Lightroom didn't return correct path, try using fixed processed directory path
                         # if not processed_image_path or not Path(processed_image_path).exists():
@@ -484,13 +1008,9 @@ class LightroomReverseClient:
                         #     processed_image_path = str(processed_dir / "before.jpg")
                         #     print(f"  🔄 Using fixed path: {processed_image_path}")
                         
-                        path_exists = Path(processed_image_path).exists()
-                        print(f"  📄 Output file: {processed_image_path}")
-                        print(f"  📂 File exists: {'✅ Yes' if path_exists else '❌ No'}")
-                        
-                        if path_exists:
-                            file_size = Path(processed_image_path).stat().st_size
-                            print(f"  📊 File size: {file_size:,} bytes")
+                        output_size = file_size(processed_image_path)
+                        logger.debug("Task %s: output file %s exists: %s, size: %s bytes",
+                                     task_id, processed_image_path, output_size is not None, output_size)
                             
                     except Exception as json_error:
                         result_data = {"message": "Processing successful"}
@@ -505,16 +1025,35 @@ class LightroomReverseClient:
                 
                 # 5. If processing successful but file doesn't exist, wait for file save to complete
                 final_image_path = processed_image_path
-                if success and processed_image_path and not Path(processed_image_path).exists():
+                output_ready = output_size is not None
+                if success and processed_image_path and not output_ready:
                     print("  ⏳ Waiting for file save to complete...")
                     file_ready, found_path = await self.wait_for_output_file(processed_image_path, 20)
                     if file_ready and found_path:
                         final_image_path = found_path
+                        output_ready = True
                         print(f"  ✅ Found output file: {final_image_path}")
                     else:
                         print(f"  ⚠️ Wait timeout, file still doesn't exist: {processed_image_path}")
 
-                # 6. Report result to source server first - state transition processing -> completed/failed
+                # 6. If processing successful and output file exists, report the result and
+                # upload the image in one request - state transition processing -> completed
+                if success and final_image_path and output_ready:
+                    print("  📤 Reporting result and uploading processed image to source server...")
+                    upload_success = await self.report_with_image(
+                        task_id=task_id,
+                        elapsed_time=elapsed,
+                        result_data=result_data,
+                        image_path=final_image_path,
+                        source_server=source_server
+                    )
+                    if upload_success:
+                        print("  ✅ Result upload successful")
+                    else:
+                        print("  ⚠️ Result upload failed")
+                    return success
+                
+                # 7. Otherwise only report the result - state transition processing -> completed/failed
                 await self.report_result(
                     task_id=task_id,
                     success=success,
@@ -524,20 +1063,10 @@ class LightroomReverseClient:
                     source_server=source_server
                 )
                 
-                # 7. If processing successful and output file exists, upload to source server
-                if success and final_image_path and Path(final_image_path).exists():
-                    # Give server some time to process state update
-                    await asyncio.sleep(0.5)
-                    print("  📤 Uploading processing result to source server...")
-                    upload_success = await self.upload_processed_image(task_id, final_image_path, source_server)
-                    if upload_success:
-                        print("  ✅ Result upload successful")
-                    else:
-                        print("  ⚠️ Result upload failed")
-                elif success and not processed_image_path:
+                if success and not processed_image_path:
                     print("  ⚠️ Processing successful but output_path is None")
                     print("  💡 This indicates the Lightroom API path return logic may have issues")
-                elif success and processed_image_path and not Path(processed_image_path).exists():
+                elif success and processed_image_path and not output_ready:
                     print(f"  ⚠️ Processing successful but output file doesn't exist: {processed_image_path}")
                     print("  💡 Possible reasons:")
                     print("     - Lightroom processing failed but returned success status")
@@ -547,7 +1076,7 @@ class LightroomReverseClient:
                 return success
         
         except Exception as e:
-            elapsed = time.time() - start_time
+            elapsed = time.monotonic() - start_time
             print(f"  ❌ Processing exception: {e}")
             
             # Also report result to source server on exception to ensure state machine transitions correctly
@@ -564,11 +1093,11 @@ class LightroomReverseClient:
     
     async def report_result(self, task_id: str, success: bool, elapsed_time: float,
                           error: Optional[str] = None, result_data: Optional[Dict] = None,
-                          source_server: Optional[Dict] = None):
+                          source_server: Optional[Dict] = None) -> bool:
         """Report task result to source server - Trigger state transition"""
         if not source_server:
             print("  ⚠️ Missing source server information, cannot report result")
-            return
+            return False
             
         try:
             result_payload = {
@@ -581,17 +1110,73 @@ class LightroomReverseClient:
             }
             
             async with self.session.post(
-                f"{source_server['url']}/api/report_result",
+                self._report_url[source_server['url']],
                 json=result_payload
             ) as response:
                 if response.status == 200:
                     status = "✅ Success" if success else "❌ Failed"
                     print(f"  📡 Result reported to {source_server['url']} ({status})")
+                    return True
                 else:
                     print(f"  ⚠️ Report failed: {response.status}")
+                    return False
         
         except Exception as e:
             print(f"  ⚠️ Report exception: {e}")
+            return False
+    
+    async def report_with_image(self, task_id: str, elapsed_time: float, result_data: Optional[Dict],
+                                image_path: str, source_server: Dict) -> bool:
+        """Report a successful result and upload the processed image in one multipart request
+        
+        Servers without /api/report_with_image answer 404; for those fall back to
+        report_result + upload_processed_image (and remember it once the plain
+        report succeeds, which shows the 404 came from the route, not the task).
+        The two-call path is also used if the combined request cannot be sent, so
+        the result still reaches the server.
+        
+        Returns:
+            bool: Whether the image was uploaded
+        """
+        url = source_server['url']
+        route_missing = False
+        if self._supports_report_with_image[url]:
+            result_payload = {
+                "task_id": task_id,
+                "client_id": self.client_id,
+                "success": True,
+                "elapsed_time": elapsed_time,
+                "error": None,
+                "result_data": result_data
+            }
+            try:
+                with open(image_path, 'rb') as f:
+                    data = aiohttp.FormData()
+                    data.add_field('result', json_dumps(result_payload), content_type='application/json')
+                    data.add_field('processed_image', f,
+                                 filename=os.path.basename(image_path),
+                                 content_type='image/jpeg')
+                    
+                    async with self.session.post(self._report_with_image_url[url], data=data) as response:
+                        if response.status == 200:
+                            result = json_loads(await response.read())
+                            print(f"  📡 Result reported to {url} (✅ Success)")
+                            print(f"    💾 Saved to {url}: {result.get('saved_path')}")
+                            return True
+                        if response.status != 404:
+                            error_text = await response.text()
+                            print(f"    ❌ Upload failed: {response.status} - {error_text}")
+                            return False
+                        route_missing = True
+            except Exception as e:
+                print(f"    ⚠️ Combined report exception, reporting separately: {e}")
+        
+        # Server predates the combined endpoint: report, then upload
+        if not await self.report_result(task_id, True, elapsed_time, result_data=result_data, source_server=source_server):
+            return False
+        if route_missing:
+            self._supports_report_with_image[url] = False
+        return await self.upload_processed_image(task_id, image_path, source_server)
     
     async def upload_processed_image(self, task_id: str, image_path: str, source_server: Dict) -> bool:
         """Upload processed image to source server"""
@@ -601,28 +1186,27 @@ class LightroomReverseClient:
                 print(f"  ❌ Image file does not exist: {image_path}")
                 return False
             
-            # Prepare multipart form data
-            data = aiohttp.FormData()
-            
-            # Add image file
+            # Prepare multipart form data; the open file is streamed in chunks
+            # (read off the event loop) instead of being loaded into memory first
             with open(image_file, 'rb') as f:
-                data.add_field('processed_image', f.read(), 
+                data = aiohttp.FormData()
+                data.add_field('processed_image', f, 
                              filename=image_file.name, 
                              content_type='image/jpeg')
-            
-            async with self.session.post(
-                f"{source_server['url']}/api/upload_result",
-                params={'task_id': task_id},
-                data=data
-            ) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    print(f"    💾 Saved to {source_server['url']}: {result.get('saved_path')}")
-                    return True
-                else:
-                    error_text = await response.text()
-                    print(f"    ❌ Upload failed: {response.status} - {error_text}")
-                    return False
+                
+                async with self.session.post(
+                    self._upload_url[source_server['url']],
+                    params={'task_id': task_id},
+                    data=data
+                ) as response:
+                    if response.status == 200:
+                        result = json_loads(await response.read())
+                        print(f"    💾 Saved to {source_server['url']}: {result.get('saved_path')}")
+                        return True
+                    else:
+                        error_text = await response.text()
+                        print(f"    ❌ Upload failed: {response.status} - {error_text}")
+                        return False
                     
         except Exception as e:
             print(f"    ❌ Upload exception: {e}")
@@ -664,110 +1248,212 @@ class LightroomReverseClient:
             if response.status != 200:
                 raise Exception(f"{file_type} file download failed: {response.status}")
             
-            # Stream write to file
+            # Stream write to file: network chunks (no re-slicing to a fixed size) are
+            # coalesced into DOWNLOAD_WRITE_SIZE buffers so the disk sees few large writes.
+            # Writes run in the default executor so the event loop keeps draining sockets
+            # and polling; one write is kept in flight while the next buffer fills.
+            loop = asyncio.get_running_loop()
             with open(local_path, 'wb') as f:
-                async for chunk in response.content.iter_chunked(8192):
-                    f.write(chunk)
+                pending_write = None
+                buffer = bytearray()
+                try:
+                    async for chunk, _ in response.content.iter_chunks():
+                        buffer += chunk
+                        if len(buffer) < DOWNLOAD_WRITE_SIZE:
+                            continue
+                        if pending_write is not None:
+                            await pending_write
+                        # Hand the full buffer to the writer thread and fill a fresh one
+                        pending_write = loop.run_in_executor(None, f.write, buffer)
+                        buffer = bytearray()
+                finally:
+                    if pending_write is not None:
+                        await pending_write
+                if buffer:
+                    f.write(buffer)
     
     async def calculate_processing_timeout(self, xmp_path: str) -> float:
-        """Calculate processing timeout based on lua configuration complexity"""
+        """Calculate processing timeout based on lua configuration complexity (cached per file version)"""
         try:
-            # Read lua configuration file content
-            with open(xmp_path, 'r', encoding='utf-8') as f:
-                lua_content = f.read()
-            
-            base_timeout = self.base_processing_timeout  # Base timeout
-            
-            # Check if contains complex mask processing
-            if 'MaskGroupBasedCorrections' in lua_content:
-                print("  🎭 Detected mask processing, extending wait time")
-                
-                # Count actual mask count in CorrectionMasks
-                # Each What = "Mask/Image" is an actual mask
-                actual_mask_count = lua_content.count('What = "Mask/Image"')
-                
-                # Add processing time for each actual mask (configurable)
-                mask_timeout = base_timeout + (actual_mask_count * self.mask_increment_seconds)
-                
-                print(f"  📊 Actual mask count: {actual_mask_count}, timeout set: {mask_timeout}s")
-                return min(mask_timeout, self.max_timeout_mask)
-            
-            # Check other potentially time-consuming operations
-            complex_operations = [
-                'LocalizedCorrections',  # Local adjustments
-                'CircularGradientBasedCorrections',  # Radial filter
-                'GradientBasedCorrections',  # Gradient filter
-                'RetouchAreas',  # Spot removal
-            ]
-            
-            complex_count = sum(1 for op in complex_operations if op in lua_content)
-            if complex_count > 0:
-                complex_timeout = base_timeout + (complex_count * self.complex_increment_seconds)  # Add configurable seconds for each complex operation
-                print(f"  ⚙️ Complex operation count: {complex_count}, timeout set: {complex_timeout}s")
-                return min(complex_timeout, self.max_timeout_complex)
+            st = os.stat(xmp_path)
+            key = (xmp_path, st.st_mtime_ns, st.st_size)
+        except OSError:
+            key = None
+        
+        processing_timeout = self._processing_timeouts.get(key) if key else None
+        if processing_timeout is not None:
+            print(f"  ♻️ Unchanged configuration, timeout set: {processing_timeout}s")
+            return processing_timeout
+        
+        processing_timeout = self._scan_processing_timeout(xmp_path)
+        if key:
+            self._remember_timeout(self._processing_timeouts, key, processing_timeout)
+        return processing_timeout
+    
+    @staticmethod
+    def _remember_timeout(cache: Dict, key, processing_timeout: float):
+        """Store a computed timeout, dropping the oldest entry beyond 512"""
+        if len(cache) >= 512:
+            del cache[next(iter(cache))]
+        cache[key] = processing_timeout
+    
+    def _scan_processing_timeout(self, xmp_path: str) -> float:
+        """Read the lua configuration and derive the processing timeout from its complexity
+        
+        Results are also cached by content digest: downloaded task files land in a
+        fresh directory every time, so a reused preset only costs a read and a hash.
+        """
+        try:
+            # Scan lua configuration bytes (all tokens are ASCII, so no decode);
+            # large files are memory-mapped and paged in by the OS as they are read
+            with open(xmp_path, 'rb') as f:
+                mapped = os.fstat(f.fileno()).st_size >= _MMAP_SCAN_MIN_SIZE
+                lua_content = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if mapped else f.read()
+            try:
+                digest = hashlib.blake2b(lua_content, digest_size=16).digest()
+                processing_timeout = self._processing_timeouts_by_content.get(digest)
+                if processing_timeout is not None:
+                    print(f"  ♻️ Known configuration, timeout set: {processing_timeout}s")
+                    return processing_timeout
+                tokens = _COMPLEXITY_TOKEN_RE.findall(lua_content)
+            finally:
+                if mapped:
+                    lua_content.close()
             
-            # Simple adjustments, use base timeout
-            print(f"  🚀 Simple adjustments, timeout set: {base_timeout}s")
-            return base_timeout
+            processing_timeout = self._timeout_from_tokens(tokens)
+            self._remember_timeout(self._processing_timeouts_by_content, digest, processing_timeout)
+            return processing_timeout
             
         except Exception as e:
             print(f"  ⚠️ Configuration parsing failed, using default timeout: {e}")
             return 30.0  # Default 30 seconds
     
+    def _timeout_from_tokens(self, tokens: list) -> float:
+        """Derive the processing timeout from the complexity tokens found in a lua configuration"""
+        # Collect every token in one pass: mask count plus the set of other tokens present
+        actual_mask_count = 0
+        found = set()
+        for token in tokens:
+            if token == _MASK_TOKEN:
+                actual_mask_count += 1
+            else:
+                found.add(token)
+        
+        base_timeout = self.base_processing_timeout  # Base timeout
+        
+        # Check if contains complex mask processing
+        if _MASK_GROUP_TOKEN in found:
+            print("  🎭 Detected mask processing, extending wait time")
+            
+            # Add processing time for each actual mask (configurable)
+            mask_timeout = base_timeout + (actual_mask_count * self.mask_increment_seconds)
+            
+            print(f"  📊 Actual mask count: {actual_mask_count}, timeout set: {mask_timeout}s")
+            return min(mask_timeout, self.max_timeout_mask)
+        
+        # Check other potentially time-consuming operations; every radial filter
+        # name also contains the gradient filter name, which counts as present too
+        if b'CircularGradientBasedCorrections' in found:
+            found.add(b'GradientBasedCorrections')
+        complex_count = len(found & _COMPLEX_OPERATIONS)
+        if complex_count > 0:
+            complex_timeout = base_timeout + (complex_count * self.complex_increment_seconds)  # Add configurable seconds for each complex operation
+            print(f"  ⚙️ Complex operation count: {complex_count}, timeout set: {complex_timeout}s")
+            return min(complex_timeout, self.max_timeout_complex)
+        
+        # Simple adjustments, use base timeout
+        print(f"  🚀 Simple adjustments, timeout set: {base_timeout}s")
+        return base_timeout
+
+    
     async def wait_for_output_file(self, file_path: str, max_wait_seconds: float) -> tuple[bool, str]:
         """Wait for output file generation, adapted to Lightroom asynchronous processing
         
         Returns:
             tuple[bool, str]: (Whether file is ready, file path)
         """
-        start_time = time.time()
+        # Prefer file events: wake as soon as Lightroom finishes writing
+        watcher = OutputFileWatcher(file_path)
+        if watcher.start():
+            try:
+                size = await watcher.wait(max_wait_seconds)
+            finally:
+                watcher.close()
+            if size:
+                print(f"    ✅ File ready: {size:,} bytes")
+                return True, file_path
+            return False, file_path
+        
+        # No file event backend on this platform (or the directory does not exist yet): poll
+        start_time = time.monotonic()
         check_interval = self.file_check_interval  # Configurable check interval
         
-        while time.time() - start_time < max_wait_seconds:
-            if Path(file_path).exists():
-                file_size = Path(file_path).stat().st_size
-                if file_size > 0:  # Ensure file is not empty
-                    print(f"    ✅ File ready: {file_size:,} bytes")
-                    return True, file_path
+        while time.monotonic() - start_time < max_wait_seconds:
+            size = file_size(file_path)
+            if size:  # Ensure file exists and is not empty
+                print(f"    ✅ File ready: {size:,} bytes")
+                return True, file_path
             
             await asyncio.sleep(check_interval)
         
         return False, file_path
     
-    async def mark_server_unavailable(self, server: Dict, error: str):
-        """Mark server as unavailable"""
-        server['available'] = False
+    @staticmethod
+    def is_server_available(server: Dict) -> bool:
+        """A server is available once its failure cooldown has expired"""
+        return time.monotonic() >= server['unavailable_until']
+    
+    @staticmethod
+    def set_server_available(server: Dict):
+        """Clear a server's failure cooldown and reset its backoff"""
+        server['unavailable_until'] = 0.0
+        server['retry_backoff'] = 1.0
+        server['last_error'] = None
+    
+    @staticmethod
+    def start_server_cooldown(server: Dict, error: str):
+        """Skip a failing server for a growing cooldown (1s, x1.5 per failure, max 60s)"""
+        backoff = server['retry_backoff']
+        server['unavailable_until'] = time.monotonic() + backoff
+        server['retry_backoff'] = min(60.0, backoff * 1.5)
         server['last_error'] = error
         server['last_failure_time'] = time.time()
-        print(f"🔴 Server {server['url']} marked as unavailable: {error}")
+    
+    async def mark_server_unavailable(self, server: Dict, error: str):
+        """Mark server as unavailable until its cooldown expires"""
+        self.start_server_cooldown(server, error)
+        print(f"🔴 Server {server['url']} marked as unavailable for {server['unavailable_until'] - time.monotonic():.1f}s: {error}")
     
     async def health_check_all_servers(self):
         """Perform health check on all servers"""
         print("👩‍⚕️ Performing health check on all servers...")
         
-        for server in self.servers:
-            try:
-                # Use short timeout for health check
-                health_timeout = aiohttp.ClientTimeout(total=5.0)
-                async with self.session.get(
-                    f"{server['url']}/api/health", 
-                    timeout=health_timeout
-                ) as response:
-                    if response.status == 200:
-                        if not server['available']:
-                            print(f"🟢 Server {server['url']} has recovered")
-                            # Re-register after server recovery
-                            await self.register_single_server(server)
-                        server['available'] = True
-                        server['last_error'] = None
-                    else:
-                        await self.mark_server_unavailable(server, f"Health check failed: {response.status}")
-            except Exception as e:
-                await self.mark_server_unavailable(server, f"Health check error: {e}")
+        # Probe every server concurrently so one dead server only costs its own timeout
+        await asyncio.gather(*map(self._health_check_server, self.servers), return_exceptions=True)
         
-        available_count = sum(1 for s in self.servers if s['available'])
+        available_count = sum(1 for s in self.servers if self.is_server_available(s))
         print(f"📊 Health check complete: {available_count}/{len(self.servers)} servers available")
     
+    async def _health_check_server(self, server: Dict):
+        """Health-check one server, re-registering it if it has just recovered"""
+        try:
+            # Use short timeout for health check
+            async with self.session.get(
+                self._health_url[server['url']], 
+                timeout=self._health_timeout
+            ) as response:
+                if response.status == 200:
+                    recovered = server['last_error'] is not None
+                    self.set_server_available(server)
+                    if recovered:
+                        print(f"🟢 Server {server['url']} has recovered")
+                        # Re-register after server recovery
+                        await self.register_single_server(server)
+                else:
+                    await self.mark_server_unavailable(server, f"Health check failed: {response.status}")
+        except Exception as e:
+            await self.mark_server_unavailable(server, f"Health check error: {e}")
+    
     async def show_polling_statistics(self):
         """Display polling statistics"""
         print("\n📊 === Polling Statistics ===")
@@ -775,13 +1461,13 @@ class LightroomReverseClient:
         print(f"📈 Consecutive empty polls: {self.consecutive_empty_polls}")
         print(f"🎯 Task acquisition statistics:")
         
-        total_tasks = sum(self.task_counts.values())
+        total_tasks = sum(server['task_count'] for server in self.servers)
         for server in self.servers:
-            task_count = self.task_counts.get(server['url'], 0)
-            last_poll = self.last_poll_time.get(server['url'], 0)
-            time_since_last = time.time() - last_poll if last_poll > 0 else float('inf')
+            task_count = server['task_count']
+            last_poll = server['last_poll_time']
+            time_since_last = time.monotonic() - last_poll if last_poll > 0 else float('inf')
             
-            status_icon = "✅" if server['available'] else "❌"
+            status_icon = "✅" if self.is_server_available(server) else "❌"
             percentage = (task_count / total_tasks * 100) if total_tasks > 0 else 0
             
             print(f"  {status_icon} {server['url']}: {task_count} tasks ({percentage:.1f}%), time since last poll: {time_since_last:.0f}s")
@@ -792,8 +1478,8 @@ class LightroomReverseClient:
     
     async def get_server_status_summary(self) -> str:
         """Get server status summary"""
-        available = [s for s in self.servers if s['available']]
-        unavailable = [s for s in self.servers if not s['available']]
+        available = [s for s in self.servers if self.is_server_available(s)]
+        unavailable = [s for s in self.servers if not self.is_server_available(s)]
         
         status = f"📊 Server status: {len(available)}/{len(self.servers)} available"
         
@@ -825,23 +1511,25 @@ class LightroomReverseClient:
         print("\n👋 Client stopped")
 
 
-# Synchronous test functions
-def test_server_connection(server_ip: str, server_port: int = 8080, timeout: float = 5.0) -> bool:
-    """Test server connection"""
+# Standalone connection test functions (one-off session, never block the event loop)
+async def _get_status(url: str, timeout: float) -> Optional[int]:
+    """GET a URL and return its HTTP status, or None if it cannot be reached"""
     try:
-        response = requests.get(f"http://{server_ip}:{server_port}/api/health", timeout=timeout)
-        return response.status_code == 200
-    except:
-        return False
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+            async with session.get(url) as response:
+                return response.status
+    except Exception:
+        return None
 
 
-def test_local_lightroom(port: int = 7777, timeout: float = 5.0) -> bool:
+async def test_server_connection(server_ip: str, server_port: int = 8080, timeout: float = 5.0) -> bool:
+    """Test server connection"""
+    return await _get_status(f"http://{server_ip}:{server_port}/api/health", timeout) == 200
+
+
+async def test_local_lightroom(port: int = 7777, timeout: float = 5.0) -> bool:
     """Test local Lightroom"""
-    try:
-        response = requests.get(f"http://localhost:{port}", timeout=timeout)
-        return response.status_code == 200
-    except:
-        return False
+    return await _get_status(f"http://localhost:{port}", timeout) == 200
 
 
 async def main():
@@ -871,22 +1559,25 @@ async def main():
     parser.add_argument('--connection-retry-delay', type=float, default=5.0, help='Connection retry delay (seconds)')
     parser.add_argument('--health-check-interval', type=float, default=30.0, help='Health check interval (seconds)')
     parser.add_argument('--max-empty-polls', type=int, default=50, help='Consecutive empty poll threshold, print log after exceeding')
+    parser.add_argument('--race-polls', action='store_true', help='Poll all servers concurrently and take the first task (instead of fair round-robin)')
     parser.add_argument('--max-retry-attempts', type=int, default=0, help='Maximum retry attempts, 0 means unlimited retries')
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], help='Logging level (DEBUG shows per-task diagnostics)')
     
     args = parser.parse_args()
+    logger.setLevel(args.log_level)
     
     if args.test:
         print("🔍 Connection test mode")
         print("=" * 30)
         
         print("Testing server connection...")
-        if test_server_connection(args.server_ip, args.server_port, timeout=args.test_timeout):
+        if await test_server_connection(args.server_ip, args.server_port, timeout=args.test_timeout):
             print("✅ Server connection OK")
         else:
             print("❌ Server connection failed")
         
         print("Testing local Lightroom...")
-        if test_local_lightroom(args.local_port, timeout=args.test_timeout):
+        if await test_local_lightroom(args.local_port, timeout=args.test_timeout):
             print("✅ Local Lightroom OK")
         else:
             print("❌ Local Lightroom connection failed")
@@ -914,7 +1605,8 @@ async def main():
         max_consecutive_failures=args.max_consecutive_failures,
         connection_retry_delay=args.connection_retry_delay,
         health_check_interval=args.health_check_interval,
-        max_empty_polls=args.max_empty_polls
+        max_empty_polls=args.max_empty_polls,
+        race_polls=args.race_polls
     )
     
     try:
@@ -3,11 +3,12 @@ Reverse Connection Server - Linux server provides task queue
 Clients actively connects to fetch tasks
 """
 
-from fastapi import FastAPI, HTTPException, File, UploadFile
+from fastapi import FastAPI, HTTPException, File, Form, UploadFile
 from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 import uvicorn
 import asyncio
+import json
 import time
 import os
 from typing import Dict, List, Optional, Any
@@ -218,9 +219,8 @@ async def start_processing(task_id: str, request: StartProcessingRequest):
         
         return {"message": "Processing started", "task_id": task_id}
 
-@app.post("/api/report_result")
-async def report_result(result: TaskResult):
-    """Mac client reports task result - atomic state transition"""
+async def record_result(result: TaskResult):
+    """Record a task result - atomic state transition processing -> completed/failed"""
     async with task_lock:
         task_id = result.task_id
         
@@ -250,9 +250,13 @@ async def report_result(result: TaskResult):
         
         return {"message": "Result recorded", "task_id": task_id}
 
-@app.post("/api/upload_result")
-async def upload_result(task_id: str, processed_image: UploadFile = File(...)):
-    """Receive processed result image uploaded by Mac client - with retry wait mechanism"""
+@app.post("/api/report_result")
+async def report_result(result: TaskResult):
+    """Mac client reports task result - atomic state transition"""
+    return await record_result(result)
+
+async def save_result_image(task_id: str, processed_image: UploadFile) -> Dict[str, Any]:
+    """Save the processed image of a completed task - with retry wait mechanism"""
     
     if task_id not in completed_tasks:
         raise HTTPException(status_code=404, detail="Task does not exist or not completed")
@@ -309,6 +313,27 @@ async def upload_result(task_id: str, processed_image: UploadFile = File(...)):
         logger.error(f"Failed to save processing result {task_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Save failed: {str(e)}")
 
+@app.post("/api/upload_result")
+async def upload_result(task_id: str, processed_image: UploadFile = File(...)):
+    """Receive processed result image uploaded by Mac client - with retry wait mechanism"""
+    return await save_result_image(task_id, processed_image)
+
+@app.post("/api/report_with_image")
+async def report_with_image(result: str = Form(...), processed_image: Optional[UploadFile] = File(None)):
+    """Report task result and upload the processed image in one request
+    
+    `result` is the TaskResult JSON; same effect as /api/report_result followed by /api/upload_result
+    """
+    try:
+        task_result = TaskResult(**json.loads(result))
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=422, detail=f"Invalid result: {e}")
+    
+    response = await record_result(task_result)
+    if processed_image is not None:
+        response.update(await save_result_image(task_result.task_id, processed_image))
+    return response
+
 @app.post("/api/submit_task_with_files")
 async def submit_task_with_files(photo_path: str, xmp_path: str):
     """Submit task requiring file transfer - efficient direct transfer"""
@@ -574,6 +599,8 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Lightroom Reverse Connection Server')
     parser.add_argument('--host', default='0.0.0.0', help='Listen address')
     parser.add_argument('--port', type=int, default=8081, help='Listen port')
+    # Longer than the client's 75s pool keepalive, so idle client sockets are closed by the client first
+    parser.add_argument('--keep-alive-timeout', type=int, default=90, help='Idle keep-alive connection timeout (seconds)')
     
     args = parser.parse_args()
     
@@ -583,4 +610,4 @@ if __name__ == "__main__":
     print("API Documentation: http://localhost:8081/docs")
     print("=" * 40)
     
-    uvicorn.run(app, host=args.host, port=args.port)
\ No newline at end of file
+    uvicorn.run(app, host=args.host, port=args.port, timeout_keep_alive=args.keep_alive_timeout)
\ No newline at end of file